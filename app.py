@@ -1,42 +1,450 @@
-from flask import Flask, render_template, jsonify, request, url_for, Response
+from flask import (
+    Flask,
+    render_template,
+    jsonify,
+    request,
+    url_for,
+    Response,
+    abort,
+    g,
+    make_response,
+)
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+import hashlib
+import mimetypes
 import os
-import glob
-import math
-import random
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import stat
+import tempfile
+import time
+
+from utils.asset_bundle import AssetBundle
+from utils.car_catalog import CarCatalog, TRANSMISSIONS
+from utils.media_catalog import MediaCatalog, SNAPSHOT_FILE, load_derivatives
+from utils.media_delivery import send_media
+from utils.metrics import Metrics, timed
+from utils.page_cache import PageCache, directory_version
+from utils.response_cache import ResponseCache
+from utils.sitemap import SitemapUrl, build_sitemaps
 
 app = Flask(__name__)
 
+# Per-deployment suffix for directories in the system temp folder
+instance_id = hashlib.sha1(app.root_path.encode()).hexdigest()[:8]
 
+
+def private_directory(path):
+    """
+    Create a directory only this user can access, or check an existing one
+
+    Other local users (e.g. on shared hosting) must not be able to plant
+    files in directories the workers load data from.
+
+    Returns:
+        str: The path, or None if the directory could not be created or is
+        owned by another user or open to group or others
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        app.logger.error(f"Error creating {path}: {e}")
+        return None
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        app.logger.error(
+            f"Not using {path}: it must be a directory owned by this user, "
+            "without group or other permissions"
+        )
+        return None
+    return path
+
+
+def template_bytecode_cache():
+    """
+    Return the compiled template cache shared by the workers, or None
+
+    Without TEMPLATE_CACHE_DIR, Jinja's per-user default directory is used,
+    which Jinja creates with mode 0700 and checks the owner of.
+    """
+    if os.environ.get("TEMPLATE_CACHE_DIR"):
+        directory = private_directory(os.environ["TEMPLATE_CACHE_DIR"])
+        return FileSystemBytecodeCache(directory) if directory else None
+    try:
+        return FileSystemBytecodeCache()
+    except RuntimeError as e:
+        app.logger.warning(f"Not caching compiled templates: {e}")
+        return None
+
+
+# Compiled templates, shared by the workers, so a new worker does not
+# compile every template again on its first requests
+app.jinja_env.bytecode_cache = template_bytecode_cache()
+
+# Fingerprinted, precompressed static files, built by build_assets.py
+asset_bundle = AssetBundle(app.static_folder)
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Gallery media index, restored from the snapshot written by the build
+# tools (or scanned) once per worker at startup, and refreshed
+# incrementally when files are added to or removed from static/assets
+media_catalog = MediaCatalog(
+    app.static_folder,
+    refresh_interval=float(os.environ.get("GALLERY_REFRESH_INTERVAL", 5)),
+    snapshot_path=os.path.join(app.instance_path, SNAPSHOT_FILE),
+    bundle=asset_bundle,
+)
+
+# Responsive derivatives of the car photos, built by convert_images.py
+car_derivatives = load_derivatives(app.static_folder, "cars", asset_bundle)
+
+# Rental fleet, loaded once per worker and reloaded when data/cars.json changes
+car_catalog = CarCatalog(
+    os.path.join(app.root_path, "data", "cars.json"),
+    refresh_interval=float(os.environ.get("GALLERY_REFRESH_INTERVAL", 5)),
+)
+
+# Card grids rendered from the catalog; each is rendered once per catalog version
+CAR_CARD_FRAGMENTS = {
+    "all-cars": lambda catalog: (catalog.cars, None),
+    # The homepage shows the first three featured cars, the rest are hidden
+    "featured": lambda catalog: (catalog.featured_cars, 3),
+}
+
+
+@app.template_global()
+def image_srcset(filename):
+    """Return the srcset for a static image, or an empty string if it has none."""
+    directory, _, name = filename.rpartition("/")
+    if directory == "assets/cars":
+        return car_derivatives.get(name, {}).get("srcset", "")
+    if directory == "assets/images":
+        return media_catalog.derivatives.get(name, {}).get("srcset", "")
+    return ""
+
+
+@app.template_global()
+def asset_url(filename):
+    """Return the fingerprinted URL of a static file, or its plain static URL if it is not bundled."""
+    return asset_bundle.url(filename) or url_for("static", filename=filename)
+
+
+@app.template_global()
+def static_file_exists(filename):
+    """Return True if a static file exists, e.g. a stylesheet built by build_css.py."""
+    return filename in asset_bundle.files or os.path.isfile(
+        os.path.join(app.static_folder, filename)
+    )
+
+
+# Serialized gallery API responses keyed by catalog version and query
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get("GALLERY_RESPONSE_CACHE_SIZE", 256))
+)
+GALLERY_CACHE_CONTROL = "public, max-age=60"
+
+# Seconds the homepage random mix stays the same (0 draws on every request)
+GALLERY_RANDOM_WINDOW = int(os.environ.get("GALLERY_RANDOM_WINDOW", 10))
+
+# Largest page (or random mix) a gallery API response may hold
+GALLERY_MAX_PER_PAGE = int(os.environ.get("GALLERY_MAX_PER_PAGE", 48))
+# Default page sizes, also used by the gallery page
+GALLERY_IMAGES_PER_PAGE = 9
+GALLERY_VIDEOS_PER_PAGE = 8
+
+# Request metrics; each worker writes a snapshot to METRICS_DIR and
+# /metrics merges the snapshots of all live workers
+metrics = Metrics(
+    private_directory(
+        os.environ.get("METRICS_DIR")
+        or os.path.join(
+            tempfile.gettempdir(), f"rental-metrics-{os.getuid()}-{instance_id}"
+        )
+    ),
+    flush_interval=float(os.environ.get("METRICS_FLUSH_INTERVAL", 1)),
+)
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    # Seconds spent per phase: scan, render, serialize
+    g.phases = {}
+
+
+@app.after_request
+def record_request_metrics(response):
+    metrics.observe_request(
+        request.endpoint or "unmatched",
+        request.method,
+        response.status_code,
+        time.perf_counter() - g.request_start,
+        response.content_length,
+        g.phases,
+    )
+    metrics.flush()
+    return response
+
+
+def serialize_json(payload):
+    """Serialize a payload to compact JSON bytes, as jsonify would."""
+    with timed(g.phases, "serialize"):
+        return (app.json.dumps(payload, separators=(",", ":")) + "\n").encode()
+
+
+def json_error(message, status=400):
+    """Return a JSON error response."""
+    return make_response(jsonify({"error": message}), status)
+
+
+def int_arg(name, default, maximum=None, minimum=1):
+    """
+    Read an integer query parameter of at least minimum, capped at maximum
+
+    Anything else aborts the request with a 400 JSON error.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    # Check the digits before converting, so huge values cost nothing; ten
+    # digits fit any 32-bit seed
+    if not (value.isascii() and value.isdigit() and len(value) <= 10) or (
+        int(value) < minimum
+    ):
+        expected = "a positive integer" if minimum == 1 else f"an integer >= {minimum}"
+        abort(json_error(f"{name} must be {expected}"))
+    value = int(value)
+    return min(value, maximum) if maximum else value
+
+
+def add_next_link(response, **args):
+    """Point a response at the next page of results, and hint clients to prefetch it."""
+    url = url_for(request.endpoint, **args)
+    response.headers["Link"] = f'<{url}>; rel="next", <{url}>; rel="prefetch"'
+    return response
+
+
+def send_cursor_page(index, kind, cursor, per_page):
+    """
+    Send the gallery items following a cursor
+
+    Args:
+        index (CatalogIndex): Catalog index read once for this request
+        kind (str): "images" or "videos"
+        cursor (str): Cursor from the previous page ("" for the first)
+        per_page (int): Number of items per page
+    """
+    if kind == "images":
+        items_after, total = index.images_after, len(index.image_items)
+    else:
+        items_after, total = index.videos_after, len(index.video_items)
+    try:
+        items, next_cursor = items_after(cursor, per_page)
+    except ValueError:
+        return json_error("cursor is invalid")
+
+    def build():
+        return serialize_json(
+            {kind: items, "next": next_cursor, "total": total, "per_page": per_page}
+        )
+
+    key = (kind, index.version, "cursor", cursor, per_page)
+    response = send_cached(response_cache.get_or_create(key, build))
+    if next_cursor:
+        add_next_link(response, cursor=next_cursor, per_page=per_page)
+    return response
+
+
+def send_cached(cached, cache_control=GALLERY_CACHE_CONTROL):
+    """Send a cached response, or a 304 if the client already has it."""
+    if request.if_none_match.contains(cached.etag):
+        response = Response(status=304)
+    else:
+        response = Response(cached.body, mimetype=cached.mimetype)
+    response.set_etag(cached.etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+# Rendered pages keyed by path and by the versions of the templates, the
+# asset bundle and the car catalog
+page_cache = PageCache(
+    maxbytes=int(os.environ.get("PAGE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+)
+PAGE_CACHE_CONTROL = "no-cache"
+# Templates only change on a deploy, which restarts the workers; with
+# template auto-reload (debug mode) the folder is checked on every request
+template_version = directory_version(app.template_folder)
+
+
+def page_version():
+    """Return the version of everything a rendered page depends on besides its path."""
+    global template_version
+    with timed(g.phases, "scan"):
+        if app.jinja_env.auto_reload:
+            template_version = directory_version(app.template_folder)
+        car_catalog.refresh_if_stale()
+    return (template_version, asset_bundle.version, car_catalog.version)
+
+
+def render_page(template, *extra_version, **context):
+    """
+    Render a page through the page cache and send it, or a 304
+
+    Pages that show more than the catalogs and templates (e.g. the gallery
+    media) pass the versions of that content as extra_version, and the
+    content itself as template context.
+    """
+    version = page_version()
+    page_cache.validate(version)
+
+    def render():
+        with timed(g.phases, "render"):
+            return render_template(template, **context)
+
+    page = page_cache.get_or_render((request.path,) + version + extra_version, render)
+
+    body, etag, encoding = page_cache.negotiate(page, request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=page.mimetype)
+    response.set_etag(etag)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if page.variants:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = PAGE_CACHE_CONTROL
+    return response
+
+
+# Internal nginx location aliasing static/assets/videos (e.g. "/protected/videos");
+# when set, video bytes are sent by nginx instead of the worker
+MEDIA_ACCEL_REDIRECT = os.environ.get("MEDIA_ACCEL_REDIRECT")
+
+
+@app.template_global()
+def car_cards(name):
+    """Return a pre-rendered car card grid from the catalog."""
+    with timed(g.phases, "scan"):
+        car_catalog.refresh_if_stale()
+
+    def render(catalog):
+        cars, visible = CAR_CARD_FRAGMENTS[name](catalog)
+        return Markup(
+            render_template("partials/car_cards.html", cars=cars, visible=visible)
+        )
+
+    return car_catalog.fragment(name, render)
+
+
+@app.template_global()
+def booking_car_names():
+    """Return the car names offered in the booking form."""
+    # The booking modal renders before the page content, so it picks up a
+    # changed catalog first
+    with timed(g.phases, "scan"):
+        car_catalog.refresh_if_stale()
+    return car_catalog.booking_options
+
+
+@app.route("/home")
 @app.route("/")
-@main_blueprint.route("/home")
 def index():
-    return render_template("index.html")
+    return render_page("index.html")
 
 
 @app.route("/all-cars")
 def all_cars():
-    return render_template("all-cars.html")
+    return render_page("all-cars.html")
 
 
 @app.route("/gallery")
 def gallery():
-    return render_template("gallery.html")
+    # The page inlines the first gallery pages, so it changes with the media
+    with timed(g.phases, "scan"):
+        media_catalog.refresh_if_stale()
+    index = media_catalog.index
+    return render_page("gallery.html", index.version, gallery=index)
+
+
+def gallery_page_payload(index, kind, page, per_page):
+    """Return a page of gallery "images" or "videos", as sent by the gallery APIs."""
+    if kind == "images":
+        items, page, total_pages = index.image_page(page, per_page)
+        total = len(index.image_items)
+    else:
+        items, page, total_pages = index.video_page(page, per_page)
+        total = len(index.video_items)
+    return {
+        kind: items,
+        "total": total,
+        "total_pages": total_pages,
+        "page": page,
+        "per_page": per_page,
+    }
+
+
+@app.template_global()
+def gallery_bootstrap(index):
+    """Return the first pages of images and videos, inlined into the gallery page."""
+    return {
+        "images": gallery_page_payload(index, "images", 1, GALLERY_IMAGES_PER_PAGE),
+        "videos": gallery_page_payload(index, "videos", 1, GALLERY_VIDEOS_PER_PAGE),
+    }
+
+
+@app.route("/api/cars")
+def cars_api():
+    """API endpoint to list the rental cars, optionally filtered"""
+    filters = {
+        "seats": int_arg("seats", None),
+        "transmission": request.args.get("transmission"),
+        "min_price": int_arg("min_price", None),
+        "max_price": int_arg("max_price", None),
+    }
+    if filters["transmission"] not in TRANSMISSIONS | {None}:
+        return json_error(
+            "transmission must be one of: " + ", ".join(sorted(TRANSMISSIONS))
+        )
+
+    with timed(g.phases, "scan"):
+        car_catalog.refresh_if_stale()
+
+    unavailable = car_catalog.unavailable_filters(**filters)
+    if unavailable:
+        return json_error(
+            f"{', '.join(unavailable)} cannot be used yet: "
+            "no car in the catalog lists that information"
+        )
+
+    def build():
+        cars = car_catalog.filter(**filters)
+        return serialize_json({"cars": cars, "total": len(cars)})
+
+    key = ("cars", car_catalog.version) + tuple(filters.values())
+    return send_cached(response_cache.get_or_create(key, build))
 
 
 @app.route("/api/gallery/images")
 def gallery_images():
     """API endpoint to serve gallery images data with pagination"""
     # Get pagination parameters
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 9))  # Default to 9 images per page
+    page = int_arg("page", 1)
+    per_page = int_arg("per_page", GALLERY_IMAGES_PER_PAGE, GALLERY_MAX_PER_PAGE)
+    # Cursor pagination: pass cursor= for the first page, then "next"
+    cursor = request.args.get("cursor")
 
-    # Get all image files from static/assets/images directory
-    image_dir = os.path.join(app.static_folder, "assets/images")
+    # Pick up new or removed files at most once per refresh interval
+    with timed(g.phases, "scan"):
+        media_catalog.refresh_if_stale()
+    index = media_catalog.index
 
     # Check if directory exists
-    if not os.path.exists(image_dir):
+    if not index.has_images:
         return jsonify(
             {
                 "error": "Image directory not found",
@@ -48,66 +456,35 @@ def gallery_images():
             }
         )
 
-    # Get all webp images
-    image_paths = glob.glob(os.path.join(image_dir, "*.webp"))
-
-    # Sort images by name
-    image_paths.sort()
-
-    # Calculate pagination
-    total_images = len(image_paths)
-    total_pages = math.ceil(total_images / per_page)
-
-    # Adjust page if out of range
-    if page < 1:
-        page = 1
-    elif page > total_pages and total_pages > 0:
-        page = total_pages
-
-    # Calculate start and end indices
-    start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total_images)
-
-    # Get paginated images
-    paginated_paths = image_paths[start_idx:end_idx]
-
-    # Format image data for the frontend
-    images = []
-    for i, path in enumerate(paginated_paths, start=start_idx + 1):
-        filename = os.path.basename(path)
-        images.append(
-            {
-                "id": i,  # Using 1-based index
-                "filename": filename,
-                "path": f"/static/assets/images/{filename}",
-                "title": f"Armada Mobil CV. Enam Satu Rentalindo #{i}",
-            }
-        )
+    if cursor is not None:
+        return send_cursor_page(index, "images", cursor, per_page)
 
-    return jsonify(
-        {
-            "images": images,
-            "total": total_images,
-            "total_pages": total_pages,
-            "page": page,
-            "per_page": per_page,
-        }
+    payload = gallery_page_payload(index, "images", page, per_page)
+    key = ("images", index.version, payload["page"], per_page)
+    response = send_cached(
+        response_cache.get_or_create(key, lambda: serialize_json(payload))
     )
+    if payload["page"] < payload["total_pages"]:
+        add_next_link(response, page=payload["page"] + 1, per_page=per_page)
+    return response
 
 
 @app.route("/api/gallery/videos")
 def gallery_videos():
     """API endpoint to serve gallery videos data with pagination"""
     # Get pagination parameters
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 8))  # Default to 8 videos per page
+    page = int_arg("page", 1)
+    per_page = int_arg("per_page", GALLERY_VIDEOS_PER_PAGE, GALLERY_MAX_PER_PAGE)
+    # Cursor pagination: pass cursor= for the first page, then "next"
+    cursor = request.args.get("cursor")
 
-    # Get all video files from static/assets/videos directory
-    video_dir = os.path.join(app.static_folder, "assets/videos")
-    thumbnails_dir = os.path.join(app.static_folder, "assets/thumbnails")
+    # Pick up new or removed files at most once per refresh interval
+    with timed(g.phases, "scan"):
+        media_catalog.refresh_if_stale()
+    index = media_catalog.index
 
-    # Check if directories exist
-    if not os.path.exists(video_dir):
+    # Check if directory exists
+    if not index.has_videos:
         return jsonify(
             {
                 "error": "Video directory not found",
@@ -119,197 +496,214 @@ def gallery_videos():
             }
         )
 
-    # Get all mp4 videos
-    video_paths = glob.glob(os.path.join(video_dir, "*.mp4"))
+    if cursor is not None:
+        return send_cursor_page(index, "videos", cursor, per_page)
 
-    # Sort videos by name
-    video_paths.sort()
+    payload = gallery_page_payload(index, "videos", page, per_page)
+    key = ("videos", index.version, payload["page"], per_page)
+    response = send_cached(
+        response_cache.get_or_create(key, lambda: serialize_json(payload))
+    )
+    if payload["page"] < payload["total_pages"]:
+        add_next_link(response, page=payload["page"] + 1, per_page=per_page)
+    return response
 
-    # Calculate pagination
-    total_videos = len(video_paths)
-    total_pages = math.ceil(total_videos / per_page)
 
-    # Adjust page if out of range
-    if page < 1:
-        page = 1
-    elif page > total_pages and total_pages > 0:
-        page = total_pages
+@app.route("/media/videos/<path:filename>")
+def media_video(filename):
+    """Serve gallery videos and their renditions with byte-range support"""
+    return send_media(
+        media_catalog.video_dir, filename, accel_prefix=MEDIA_ACCEL_REDIRECT
+    )
 
-    # Calculate start and end indices
-    start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total_videos)
 
-    # Get paginated videos
-    paginated_paths = video_paths[start_idx:end_idx]
+@app.route("/dist/<path:filename>")
+def bundled_asset(filename):
+    """Serve a fingerprinted static file, precompressed if the client accepts it"""
+    encoded, encoding = asset_bundle.negotiate(filename, request.accept_encodings)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    response = send_media(
+        asset_bundle.directory,
+        encoded,
+        mimetype=mimetype,
+        max_age=ASSET_MAX_AGE,
+        content_encoding=encoding,
+        immutable=True,
+    )
+    if asset_bundle.encodings.get(filename):
+        response.vary.add("Accept-Encoding")
+    return response
 
-    # Format video data for the frontend
-    videos = []
-    for i, path in enumerate(paginated_paths, start=start_idx + 1):
-        filename = os.path.basename(path)
-        basename = os.path.splitext(filename)[0]
 
-        # Check if a thumbnail exists for this video
-        thumbnail_filename = f"{basename}.webp"
-        thumbnail_path = os.path.join(thumbnails_dir, thumbnail_filename)
+@app.route("/api/gallery/random")
+def gallery_random():
+    """API endpoint to serve a random mix of images and videos for the homepage"""
+    count = int_arg("count", 8, GALLERY_MAX_PER_PAGE)  # Default to 8 items
 
-        if os.path.exists(thumbnail_path):
-            thumbnail_url = f"/static/assets/thumbnails/{thumbnail_filename}"
-        else:
-            # Fallback to a placeholder image
-            thumbnail_url = f"/static/assets/thumbnails/video-placeholder.webp"
+    # Pick up new or removed files at most once per refresh interval
+    with timed(g.phases, "scan"):
+        media_catalog.refresh_if_stale()
+    index = media_catalog.index
 
-        videos.append(
-            {
-                "id": i,  # Using 1-based index
-                "filename": filename,
-                "path": f"/static/assets/videos/{filename}",
-                "thumbnail": thumbnail_url,
-                "title": f"Video Armada #{i}",
-            }
-        )
+    if not index.image_items and not index.video_items:
+        return jsonify({"error": "No gallery items found", "items": []})
 
-    return jsonify(
-        {
-            "videos": videos,
-            "total": total_videos,
-            "total_pages": total_pages,
-            "page": page,
-            "per_page": per_page,
-        }
+    # A seed gives a reproducible mix; otherwise the mix rotates once per
+    # window and is shared by every visitor (and worker) in that window
+    seed = int_arg("seed", None, minimum=0)
+    window = int_arg("window", GALLERY_RANDOM_WINDOW, minimum=0)
+    if seed is None and window <= 0:
+        return jsonify({"items": index.sample(count)})
+
+    if seed is None:
+        now = time.time()
+        seed = int(now // window)
+        cache_control = f"public, max-age={int(window - now % window) or 1}"
+    else:
+        cache_control = GALLERY_CACHE_CONTROL
+
+    key = ("random", index.version, count, seed)
+    cached = response_cache.get_or_create(
+        key, lambda: serialize_json({"items": index.sample(count, seed)})
     )
+    return send_cached(cached, cache_control)
 
 
-@app.route("/api/gallery/random")
-def gallery_random():
-    """API endpoint to serve a random mix of images and videos for the homepage"""
-    count = int(request.args.get("count", 8))  # Default to 8 items
-
-    # Get all image and video files
-    image_dir = os.path.join(app.static_folder, "assets/images")
-    video_dir = os.path.join(app.static_folder, "assets/videos")
-    thumbnails_dir = os.path.join(app.static_folder, "assets/thumbnails")
-
-    images = []
-    videos = []
-
-    # Get images if directory exists
-    if os.path.exists(image_dir):
-        image_paths = glob.glob(os.path.join(image_dir, "*.webp"))
-        for i, path in enumerate(image_paths, start=1):
-            filename = os.path.basename(path)
-            images.append(
-                {
-                    "id": i,
-                    "type": "image",
-                    "filename": filename,
-                    "path": f"/static/assets/images/{filename}",
-                    "title": f"Armada Mobil CV. Enam Satu Rentalindo #{i}",
-                }
-            )
+@app.route("/metrics")
+def prometheus_metrics():
+    """Request metrics of all workers in the Prometheus text format"""
+    return Response(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-    # Get videos if directory exists
-    if os.path.exists(video_dir):
-        video_paths = glob.glob(os.path.join(video_dir, "*.mp4"))
-        for i, path in enumerate(video_paths, start=1):
-            filename = os.path.basename(path)
-            basename = os.path.splitext(filename)[0]
-
-            # Check if a thumbnail exists for this video
-            thumbnail_filename = f"{basename}.webp"
-            thumbnail_path = os.path.join(thumbnails_dir, thumbnail_filename)
-
-            if os.path.exists(thumbnail_path):
-                thumbnail_url = f"/static/assets/thumbnails/{thumbnail_filename}"
-            else:
-                # Fallback to a placeholder image
-                thumbnail_url = f"/static/assets/thumbnails/video-placeholder.webp"
-
-            videos.append(
-                {
-                    "id": i,
-                    "type": "video",
-                    "filename": filename,
-                    "path": f"/static/assets/videos/{filename}",
-                    "thumbnail": thumbnail_url,
-                    "title": f"Video Armada #{i}",
-                }
-            )
 
-    # Combine and shuffle items
-    all_items = images + videos
+# Pages listed in the sitemap, with the templates they are rendered from
+SITEMAP_PAGES = [
+    ("index", "index.html", "daily", 1.0),  # Homepage
+    ("all_cars", "all-cars.html", "weekly", 0.8),  # All cars listing
+    ("gallery", "gallery.html", "weekly", 0.7),  # Gallery page
+]
+SITEMAP_CACHE_CONTROL = "public, max-age=3600"
 
-    if not all_items:
-        return jsonify({"error": "No gallery items found", "items": []})
 
-    # Shuffle and limit to requested count
-    random.shuffle(all_items)
-    random_items = all_items[: min(count, len(all_items))]
+def file_mtime(path):
+    """Return the modification time of a file, or 0 if it is missing."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
 
-    return jsonify({"items": random_items})
 
+def sitemap_urls(gallery):
+    """Describe the site's pages, with the images and videos they show, for the sitemap."""
 
-def add_url_to_sitemap(urlset, loc, lastmod=None, changefreq=None, priority=None):
-    """Helper function to add a URL to the sitemap."""
-    url = ET.SubElement(urlset, "url")
-    ET.SubElement(url, "loc").text = loc
+    def external(path):
+        return request.host_url.rstrip("/") + path
 
-    if lastmod:
-        if isinstance(lastmod, datetime):
-            lastmod_str = lastmod.strftime("%Y-%m-%d")
-        else:
-            lastmod_str = str(lastmod)
-        ET.SubElement(url, "lastmod").text = lastmod_str
+    def template_mtime(template):
+        names = ["base.html", template]
+        if template != "gallery.html":
+            names.append("partials/car_cards.html")
+        return max(file_mtime(os.path.join(app.template_folder, name)) for name in names)
 
-    if changefreq:
-        ET.SubElement(url, "changefreq").text = changefreq
+    car_dir = os.path.join(app.static_folder, "assets", "cars")
+    catalog_mtime = file_mtime(car_catalog.path)
 
-    if priority is not None:
-        ET.SubElement(url, "priority").text = str(priority)
+    def car_media(cars):
+        images = [external(asset_url(f"assets/cars/{car['image']}")) for car in cars]
+        mtimes = [file_mtime(os.path.join(car_dir, car["image"])) for car in cars]
+        return images, max([catalog_mtime] + mtimes), []
 
+    # Newest uploads first, in case the gallery outgrows the image limit
+    gallery_images = sorted(
+        zip(gallery.images or [], gallery.image_items),
+        key=lambda pair: pair[0].mtime,
+        reverse=True,
+    )
+    gallery_videos = [
+        {
+            "thumbnail_loc": external(item["thumbnail"]),
+            "title": item["title"],
+            "description": f"{item['title']} - armada rental mobil CV. Enam Satu Rentalindo di Palu",
+            "content_loc": external(item["path"]),
+        }
+        for item in gallery.video_items
+    ]
+    gallery_mtime = max(
+        [entry.mtime for entry in gallery.images or []]
+        + [entry.mtime for entry in gallery.videos or []]
+        + [0]
+    )
 
-@app.route("/sitemap.xml")
-def sitemap():
-    """Generates the sitemap.xml dynamically."""
-    try:
-        # Create the root <urlset> element with namespace
-        urlset = ET.Element(
-            "urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+    media = {
+        "index": car_media(car_catalog.featured_cars),
+        "all_cars": car_media(car_catalog.cars),
+        "gallery": (
+            [external(item["path"]) for _, item in gallery_images],
+            gallery_mtime,
+            gallery_videos,
+        ),
+    }
+
+    urls = []
+    for endpoint, template, changefreq, priority in SITEMAP_PAGES:
+        images, mtime, videos = media[endpoint]
+        urls.append(
+            SitemapUrl(
+                url_for(endpoint, _external=True),
+                max(mtime, template_mtime(template)),
+                changefreq,
+                priority,
+                images,
+                videos,
+            )
         )
+    return urls
 
-        # Define static pages for this rental car website
-        static_endpoints = [
-            ("index", "daily", 1.0),  # Homepage
-            ("all_cars", "weekly", 0.8),  # All cars listing
-            ("gallery", "weekly", 0.7),  # Gallery page
-        ]
 
-        # Get current date for lastmod
-        today = datetime.now().strftime("%Y-%m-%d")
+# Sitemap documents of the latest version served
+sitemap_cache = {}
 
-        # Add all static pages to sitemap
-        for endpoint, changefreq, priority in static_endpoints:
-            try:
-                loc = url_for(endpoint, _external=True)
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=today, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                app.logger.warning(
-                    f"Sitemap: Could not generate URL for static endpoint '{endpoint}': {e}"
-                )
 
-        # Convert the ElementTree to an XML string
-        sitemap_xml_string = ET.tostring(urlset, encoding="unicode", method="xml")
-
-        # Add the XML declaration
-        final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sitemap_xml_string
+def sitemap_documents(version, gallery):
+    """Build the sitemap documents once per host and catalog, template and asset version."""
+    documents = sitemap_cache.get(version)
+    if documents is None:
+        with timed(g.phases, "serialize"):
+            documents = build_sitemaps(
+                sitemap_urls(gallery),
+                lambda n: url_for("sitemap", part=n, _external=True),
+            )
+        sitemap_cache.clear()
+        sitemap_cache[version] = documents
+    return documents
 
-        return Response(final_xml, mimetype="application/xml")
 
+@app.route("/sitemap.xml", defaults={"part": 0})
+@app.route("/sitemap-<int:part>.xml")
+def sitemap(part):
+    """Serves the sitemap.xml, or one of its parts when it is split by a sitemap index."""
+    try:
+        with timed(g.phases, "scan"):
+            media_catalog.refresh_if_stale()
+        gallery = media_catalog.index
+        version = (request.host_url, gallery.version) + page_version()
+        documents = sitemap_documents(version, gallery)
     except Exception as err:
         app.logger.error(f"Sitemap generation failed due to unexpected error: {err}")
         return Response("Error generating sitemap", status=500, mimetype="text/plain")
 
+    # Parts only exist when /sitemap.xml is an index
+    if part >= len(documents) or (part and len(documents) == 1):
+        abort(404)
+
+    cached = response_cache.get_or_create(
+        ("sitemap", part) + version,
+        lambda: documents[part],
+        mimetype="application/xml",
+    )
+    return send_cached(cached, SITEMAP_CACHE_CONTROL)
+
 
 if __name__ == "__main__":
-    app.run(debug=True, threaded=False)
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+ASGI Entry Point
+
+This module serves the Flask app from an ASGI server, so slow clients do
+not tie up a worker:
+
+    uvicorn asgi:application --workers 2
+"""
+
+import os
+
+from app import app
+from utils.asgi_adapter import AsgiAdapter
+
+application = AsgiAdapter(app, threads=int(os.environ.get("ASGI_THREADS", 8)))
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Static Asset Bundle Tool
+
+This script writes fingerprinted, precompressed copies of the static files
+to static/dist for long-lived caching.
+"""
+
+import sys
+from utils.asset_bundle import main
+
+if __name__ == "__main__":
+    sys.exit(main())
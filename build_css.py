@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Stylesheet Build Tool
+
+This script builds the purged Tailwind and Font Awesome stylesheets that
+replace the CDN versions.
+"""
+
+import sys
+from utils.css_builder import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,9 @@ It automatically detects and converts images in specified directories.
 import os
 import sys
 import argparse
-from utils.image_converter import process_directory
+from utils.image_converter import process_directory, build_derivatives, DERIVATIVE_WIDTHS
+from utils.build_cache import BuildCache, default_cache_path, find_static_folder
+from utils.media_catalog import save_catalog_snapshot
 
 def main():
     parser = argparse.ArgumentParser(description="Convert images to WebP format for web optimization")
@@ -21,6 +23,20 @@ def main():
                       help="Replace original files with WebP versions")
     parser.add_argument('--no-recursive', action='store_true', 
                       help="Don't process subdirectories")
+    parser.add_argument('--jobs', type=int, default=1,
+                      help="Number of parallel worker processes, 0 uses all CPU cores (default: 1)")
+    parser.add_argument('--cache',
+                      help="Build manifest used to skip unchanged images (default: instance/build-cache.json next to the static folder)")
+    parser.add_argument('--force', action='store_true',
+                      help="Rebuild everything, ignoring the build manifest")
+    parser.add_argument('--derivatives', action='store_true',
+                      help="Generate responsive derivatives (several widths) and a manifest instead of converting")
+    parser.add_argument('--widths', default=','.join(map(str, DERIVATIVE_WIDTHS)),
+                      help="Comma-separated derivative widths (default: 320,640,1280)")
+    parser.add_argument('--avif', action='store_true',
+                      help="Also generate AVIF derivatives when Pillow supports it")
+    parser.add_argument('--output',
+                      help="Directory for derivatives (default: assets/derivatives/<dir name> in the static folder of --dir)")
     
     args = parser.parse_args()
     
@@ -29,13 +45,34 @@ def main():
         print(f"Error: Directory '{args.dir}' does not exist")
         return 1
     
-    # Process the directory
-    print(f"Converting images in '{args.dir}' to WebP format (quality: {args.quality})")
-    if args.replace:
-        print("Original files will be replaced with WebP versions")
+    cache_path = args.cache or default_cache_path(args.dir)
+    cache = BuildCache(cache_path, force=args.force) if cache_path else None
     
-    process_directory(args.dir, args.quality, args.replace, not args.no_recursive)
-    return 0
+    if args.derivatives:
+        widths = tuple(int(w) for w in args.widths.split(',') if w.strip())
+        formats = ('webp', 'avif') if args.avif else ('webp',)
+        output = args.output
+        if output is None:
+            static_folder = find_static_folder(args.dir)
+            if static_folder is None:
+                print(f"Error: '{args.dir}' is not inside a static/assets directory, pass --output")
+                return 1
+            output = os.path.join(static_folder, 'assets', 'derivatives', os.path.basename(os.path.normpath(args.dir)))
+        print(f"Building responsive derivatives for '{args.dir}' in '{output}'")
+        manifest = build_derivatives(args.dir, output, widths, args.quality, formats, cache)
+        status = 0 if manifest is not None else 1
+    else:
+        # Process the directory
+        print(f"Converting images in '{args.dir}' to WebP format (quality: {args.quality})")
+        if args.replace:
+            print("Original files will be replaced with WebP versions")
+        
+        results = process_directory(args.dir, args.quality, args.replace, not args.no_recursive, args.jobs, cache)
+        status = 1 if any(not result.ok for result in results) else 0
+    
+    # Let new app workers start from the updated catalog
+    save_catalog_snapshot(args.dir)
+    return status
 
 if __name__ == "__main__":
     sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Static Site Export Tool
+
+This script writes the pages, the gallery API pages and the sitemap as
+static, precompressed files, so the site can be served without Python.
+"""
+
+import sys
+from utils.site_export import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,16 +5,31 @@ Video Thumbnail Generator Tool
 This script generates thumbnail images from videos for web display.
 """
 
+import io
 import os
 import sys
+import json
+import time
+import shutil
 import argparse
-from utils.video_thumbnails import process_videos
+from utils.video_thumbnails import extract_frames, frame_to_image
+from utils.build_cache import BuildCache, default_cache_path
+from utils.batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+from utils.image_converter import describe_image, write_manifest, PLACEHOLDER_SIZE
+from utils.media_catalog import save_catalog_snapshot
 import glob
 from PIL import Image
 import subprocess
 
-def generate_image_thumbnails(source_dir, target_dir, size=(400, 300)):
-    """Generate thumbnails for images in the source directory and save to target directory."""
+# Seconds the batch watchdog waits beyond the per-video ffmpeg timeout
+WATCHDOG_GRACE = 5
+
+def generate_image_thumbnails(source_dir, target_dir, size=(400, 300), cache=None):
+    """Generate thumbnails for images in the source directory and save to target directory.
+
+    With a BuildCache, a thumbnail is only regenerated when its source content
+    or the thumbnail parameters changed; without one, existing files are skipped.
+    """
     # Create target directory if it doesn't exist
     os.makedirs(target_dir, exist_ok=True)
     
@@ -28,31 +43,115 @@ def generate_image_thumbnails(source_dir, target_dir, size=(400, 300)):
         print(f"No image files found in {source_dir}")
         return
     
+    params = {'size': list(size), 'quality': 85}
+    
     # Process each image file
     for img_path in image_files:
         filename = os.path.basename(img_path)
         name, ext = os.path.splitext(filename)
         thumbnail_path = os.path.join(target_dir, f"{name}.webp")
         
-        # Skip if thumbnail already exists
-        if os.path.exists(thumbnail_path):
+        # Skip if thumbnail is up to date
+        if cache is not None:
+            if cache.is_fresh('image-thumbnail', img_path, params, [thumbnail_path], adopt_existing=True):
+                continue
+        elif os.path.exists(thumbnail_path):
             print(f"Thumbnail already exists for {filename}, skipping...")
             continue
         
         try:
             # Open and resize image
             with Image.open(img_path) as img:
-                img = img.convert('RGB')  # Convert to RGB mode for webp conversion
+                # Palette and bilevel images can only be resized pixel by pixel
+                if img.mode in ('1', 'P'):
+                    img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+                # Resize before anything decodes the full image: with Pillow's
+                # default reducing_gap, JPEGs are then decoded at 1/2, 1/4 or
+                # 1/8 scale (draft mode) and box-reduced before the resampling
                 img.thumbnail(size)
+                img = img.convert('RGB')  # Convert to RGB mode for webp conversion
                 
                 # Save as webp with good quality and compression
                 img.save(thumbnail_path, 'WEBP', quality=85)
                 print(f"Generated thumbnail for {filename} -> {thumbnail_path}")
+            if cache is not None:
+                cache.record('image-thumbnail', img_path, params, [thumbnail_path])
         except Exception as e:
             print(f"Error generating thumbnail for {filename}: {e}")
 
-def generate_video_thumbnails(source_dir, target_dir, size=(400, 300)):
-    """Generate thumbnails for videos in the source directory and save to target directory."""
+def read_video_frame(video_path, size=(400, 300), timestamp=1, timeout=None):
+    """Decode one video frame straight into memory, scaled to fit within size.
+
+    ffmpeg streams the frame as raw RGB pixels (PPM) over a pipe, scaled down
+    by the decoder, so there is no intermediate file and no extra lossy
+    encode. Without ffmpeg, the frame is taken from OpenCV instead.
+
+    Returns:
+        PIL.Image.Image: The decoded RGB frame
+    """
+    if shutil.which('ffmpeg') is None:
+        frames = extract_frames(video_path, [timestamp])
+        if not frames or frames[0][1] is None:
+            raise RuntimeError(f"Could not read frame at {timestamp}s from {video_path}")
+        frame = frames[0][1]
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(size[0] / frame_width, size[1] / frame_height, 1)
+        img = frame_to_image(frame, max(1, int(frame_width * scale)))
+        img.thumbnail(size)
+        return img
+    
+    width, height = size
+    cmd = [
+        'ffmpeg',
+        '-ss', str(timestamp),
+        '-i', video_path,
+        '-frames:v', '1',
+        # Fit within the thumbnail box without upscaling small videos,
+        # averaging the source pixels (area filter) when shrinking
+        '-vf', f"scale='min(iw,{width})':'min(ih,{height})':force_original_aspect_ratio=decrease:flags=area",
+        '-f', 'image2pipe',
+        '-c:v', 'ppm',
+        '-'
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if not result.stdout:
+        raise RuntimeError(f"ffmpeg returned no frame at {timestamp}s from {video_path}")
+    
+    img = Image.open(io.BytesIO(result.stdout))
+    img.load()
+    return img
+
+def extract_video_thumbnail(video_path, target_dir, size=(400, 300), timeout=None):
+    """Extract a frame from a video and save it as a WebP thumbnail.
+
+    Raises on failure; an ffmpeg run longer than ``timeout`` seconds is killed.
+
+    Returns:
+        str: Path to the generated thumbnail
+    """
+    filename = os.path.basename(video_path)
+    name, ext = os.path.splitext(filename)
+    thumbnail_path = os.path.join(target_dir, f"{name}.webp")
+    
+    # Extract frame at 1 second to avoid black frames at the beginning
+    print(f"Extracting frame from {filename}...")
+    img = read_video_frame(video_path, size, timestamp=1, timeout=timeout)
+    
+    # Resize and convert to webp
+    img = img.convert('RGB')
+    img.thumbnail(size)
+    img.save(thumbnail_path, 'WEBP', quality=85)
+    
+    print(f"Generated thumbnail for {filename} -> {thumbnail_path}")
+    return thumbnail_path
+
+def generate_video_thumbnails(source_dir, target_dir, size=(400, 300), cache=None, jobs=1, timeout=None):
+    """Generate thumbnails for videos in the source directory and save to target directory.
+
+    With a BuildCache, a thumbnail is only regenerated when its source content
+    or the thumbnail parameters changed; without one, existing files are skipped.
+    Up to ``jobs`` ffmpeg decodes run concurrently, each limited to ``timeout`` seconds.
+    """
     # Create target directory if it doesn't exist
     os.makedirs(target_dir, exist_ok=True)
     
@@ -66,49 +165,41 @@ def generate_video_thumbnails(source_dir, target_dir, size=(400, 300)):
         print(f"No video files found in {source_dir}")
         return
     
-    # Process each video file
-    for video_path in video_files:
+    params = {'size': list(size), 'quality': 85, 'timestamp': 1}
+    
+    # Collect the videos whose thumbnail needs to be (re)generated
+    pending = []
+    for video_path in sorted(video_files):
         filename = os.path.basename(video_path)
         name, ext = os.path.splitext(filename)
         thumbnail_path = os.path.join(target_dir, f"{name}.webp")
         
-        # Skip if thumbnail already exists
-        if os.path.exists(thumbnail_path):
+        # Skip if thumbnail is up to date
+        if cache is not None:
+            if cache.is_fresh('video-thumbnail', video_path, params, [thumbnail_path], adopt_existing=True):
+                continue
+        elif os.path.exists(thumbnail_path):
             print(f"Thumbnail already exists for {filename}, skipping...")
             continue
-        
-        try:
-            # Extract frame from the middle of the video using ffmpeg
-            temp_jpg = os.path.join(target_dir, f"{name}_temp.jpg")
-            
-            # Extract frame at 1 second to avoid black frames at the beginning
-            cmd = [
-                'ffmpeg', 
-                '-i', video_path, 
-                '-ss', '00:00:01', 
-                '-frames:v', '1', 
-                '-q:v', '2',
-                temp_jpg
-            ]
-            
-            print(f"Extracting frame from {filename}...")
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Resize and convert to webp
-            with Image.open(temp_jpg) as img:
-                img = img.convert('RGB')
-                img.thumbnail(size)
-                img.save(thumbnail_path, 'WEBP', quality=85)
-            
-            # Remove temporary jpg file
-            os.remove(temp_jpg)
-            print(f"Generated thumbnail for {filename} -> {thumbnail_path}")
-            
-        except Exception as e:
-            print(f"Error generating thumbnail for {filename}: {e}")
-            # If the file exists, clean up
-            if os.path.exists(temp_jpg):
-                os.remove(temp_jpg)
+        pending.append(video_path)
+    
+    if not pending:
+        return
+    
+    # Every video runs under the batch watchdog, which also bounds the
+    # OpenCV fallback; it allows a few seconds more than the ffmpeg timeout
+    # so a hung ffmpeg is stopped by its own timeout and not orphaned
+    jobs = min(resolve_jobs(jobs), len(pending))
+    watchdog = timeout + WATCHDOG_GRACE if timeout else None
+    start = time.perf_counter()
+    results = run_batch(extract_video_thumbnail, pending, (target_dir, size, timeout), jobs, print_progress,
+                        timeout=watchdog)
+    elapsed = time.perf_counter() - start
+    
+    for result in results:
+        if result.ok and cache is not None:
+            cache.record('video-thumbnail', result.item, params, [result.value])
+    print_batch_report(results, elapsed, jobs, 'videos')
 
 def create_placeholder_image(target_dir, size=(400, 300)):
     """Create a placeholder image for videos without thumbnails"""
@@ -125,6 +216,36 @@ def create_placeholder_image(target_dir, size=(400, 300)):
     img.save(placeholder_path, 'WEBP', quality=85)
     print(f"Created video placeholder: {placeholder_path}")
 
+def write_thumbnail_manifest(target_dir):
+    """Write the dimensions and inline placeholders of all thumbnails to manifest.json.
+
+    Entries are reused while a thumbnail's size and mtime are unchanged, so
+    only new or regenerated thumbnails are decoded.
+    """
+    manifest_path = os.path.join(target_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    if previous.get('placeholder') != PLACEHOLDER_SIZE:
+        previous = {}
+    known = previous.get('thumbnails', {})
+    
+    thumbnails = {}
+    for thumbnail_path in sorted(glob.glob(os.path.join(target_dir, '*.webp'))):
+        filename = os.path.basename(thumbnail_path)
+        stat = os.stat(thumbnail_path)
+        entry = known.get(filename)
+        if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = dict(describe_image(thumbnail_path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        thumbnails[filename] = entry
+    
+    manifest = {'placeholder': PLACEHOLDER_SIZE, 'thumbnails': thumbnails}
+    if manifest != previous:
+        write_manifest(manifest_path, manifest)
+        print(f"Wrote placeholders for {len(thumbnails)} thumbnails to {manifest_path}")
+
 def main():
     parser = argparse.ArgumentParser(description="Generate thumbnails for images and videos")
     parser.add_argument('--images', action='store_true', help='Generate thumbnails for images')
@@ -135,6 +256,11 @@ def main():
     parser.add_argument('--thumbnail-dir', default='static/assets/thumbnails', help='Target directory for thumbnails')
     parser.add_argument('--width', type=int, default=400, help='Thumbnail width')
     parser.add_argument('--height', type=int, default=300, help='Thumbnail height')
+    parser.add_argument('--cache',
+                        help='Build manifest used to skip unchanged sources (default: instance/build-cache.json next to the static folder)')
+    parser.add_argument('--force', action='store_true', help='Regenerate all thumbnails, ignoring the build manifest')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of videos processed in parallel (0 = all cores)')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds before a single video is abandoned (0 disables)')
     
     args = parser.parse_args()
     
@@ -144,17 +270,29 @@ def main():
     
     size = (args.width, args.height)
     
+    cache_path = args.cache or default_cache_path(args.thumbnail_dir)
+    cache = BuildCache(cache_path, force=args.force) if cache_path else None
+    
     # Create placeholder image
     create_placeholder_image(args.thumbnail_dir, size)
     
     # Process based on options
     if args.images or args.all:
         print(f"Generating image thumbnails from {args.image_dir} to {args.thumbnail_dir}...")
-        generate_image_thumbnails(args.image_dir, args.thumbnail_dir, size)
+        generate_image_thumbnails(args.image_dir, args.thumbnail_dir, size, cache)
+        if cache is not None:
+            cache.save()
     
     if args.videos or args.all:
         print(f"Generating video thumbnails from {args.video_dir} to {args.thumbnail_dir}...")
-        generate_video_thumbnails(args.video_dir, args.thumbnail_dir, size)
+        generate_video_thumbnails(args.video_dir, args.thumbnail_dir, size, cache, args.jobs, args.timeout or None)
+        if cache is not None:
+            cache.save()
+    
+    write_thumbnail_manifest(args.thumbnail_dir)
+    
+    # Let new app workers start from the updated catalog
+    save_catalog_snapshot(args.thumbnail_dir)
     
     return 0
 
@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    """A static folder with three gallery images and one video."""
+    static = tmp_path / 'static'
+    images = static / 'assets' / 'images'
+    videos = static / 'assets' / 'videos'
+    images.mkdir(parents=True)
+    videos.mkdir(parents=True)
+    for name in ('a.webp', 'b.webp', 'c.webp'):
+        (images / name).write_bytes(b'RIFF' + name.encode())
+    (videos / 'clip.mp4').write_bytes(bytes(range(256)) * 4)
+    return static
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
@@ -0,0 +1,75 @@
+import pytest
+
+from utils.media_catalog import MediaCatalog, decode_cursor, encode_cursor, keyset_page
+
+
+def test_cursor_round_trip():
+    for filename in ('a.webp', 'WA-0001 (1).webp', 'mobil-ä.webp'):
+        cursor = encode_cursor(filename)
+        assert '=' not in cursor
+        assert decode_cursor(cursor) == filename
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', '@@@@', 'x' * 2000])
+def test_decode_cursor_rejects_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_page_walks_all_items():
+    keys = ['a', 'b', 'c', 'd', 'e']
+    items = [{'filename': key} for key in keys]
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = keyset_page(items, keys, cursor, 2)
+        pages.append([item['filename'] for item in page])
+        if cursor is None:
+            break
+    assert pages == [['a', 'b'], ['c', 'd'], ['e']]
+
+
+def test_keyset_page_is_stable_when_files_are_added():
+    keys = ['b', 'd', 'f']
+    _, cursor = keyset_page(keys, keys, None, 2)
+
+    # A file sorting before the cursor does not shift the next page
+    keys = ['a', 'b', 'd', 'f']
+    page, next_cursor = keyset_page(keys, keys, cursor, 2)
+    assert page == ['f']
+    assert next_cursor is None
+
+
+def test_version_follows_directory_contents(static_folder):
+    catalog = MediaCatalog(str(static_folder), refresh_interval=0)
+    version = catalog.version
+    assert version
+    assert MediaCatalog(str(static_folder)).version == version
+
+    (static_folder / 'assets' / 'images' / 'd.webp').write_bytes(b'RIFFd')
+    assert catalog.refresh_if_stale()
+    assert catalog.version != version
+    assert catalog.image_keys == ['a.webp', 'b.webp', 'c.webp', 'd.webp']
+
+
+def test_index_is_published_in_one_assignment(static_folder):
+    catalog = MediaCatalog(str(static_folder), refresh_interval=0)
+    index = catalog.index
+
+    (static_folder / 'assets' / 'images' / 'a.webp').unlink()
+    catalog.refresh_if_stale()
+
+    # A request holding the old index keeps a consistent view of it
+    assert [item['filename'] for item in index.image_items] == index.image_keys
+    assert len(index.image_items) == 3
+    assert catalog.index.image_keys == ['b.webp', 'c.webp']
+
+
+def test_snapshot_round_trip(static_folder, tmp_path):
+    snapshot = tmp_path / 'instance' / 'catalog.snapshot'
+    catalog = MediaCatalog(str(static_folder), snapshot_path=str(snapshot))
+    assert snapshot.exists()
+
+    restored = MediaCatalog(str(static_folder), snapshot_path=str(snapshot))
+    assert restored.version == catalog.version
+    assert list(restored.image_items) == catalog.image_items
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from flask import Flask
+from werkzeug.http import http_date
+
+from utils.media_delivery import send_media
+
+MTIME = 1700000000
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / 'clip one.mp4'
+    path.write_bytes(bytes(range(256)) * 4)
+    os.utime(path, (MTIME + 0.5, MTIME + 0.5))
+    return tmp_path
+
+
+@pytest.fixture
+def client(media):
+    app = Flask(__name__)
+
+    @app.route('/media/<path:filename>')
+    def media_file(filename):
+        return send_media(str(media), filename)
+
+    @app.route('/accel/<path:filename>')
+    def accel_file(filename):
+        return send_media(str(media), filename, accel_prefix='/protected/')
+
+    return app.test_client()
+
+
+def test_full_response(client):
+    response = client.get('/media/clip one.mp4')
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.content_length == 1024
+    assert response.data == bytes(range(256)) * 4
+
+
+def test_single_range(client):
+    response = client.get('/media/clip one.mp4', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == 'bytes 10-19/1024'
+    assert response.data == bytes(range(10, 20))
+
+
+def test_unsatisfiable_range(client):
+    response = client.get('/media/clip one.mp4', headers={'Range': 'bytes=2000-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */1024'
+
+
+def test_conditional_get(client):
+    etag = client.get('/media/clip one.mp4').headers['ETag']
+    response = client.get('/media/clip one.mp4', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('validator, status', [
+    ('etag', 206),
+    ('"stale"', 200),
+    (http_date(MTIME), 206),
+    (http_date(MTIME - 60), 200),
+])
+def test_if_range(client, validator, status):
+    if validator == 'etag':
+        validator = client.get('/media/clip one.mp4').headers['ETag']
+    response = client.get('/media/clip one.mp4', headers={'Range': 'bytes=0-9', 'If-Range': validator})
+    assert response.status_code == status
+    assert response.content_length == (10 if status == 206 else 1024)
+
+
+def test_missing_file(client):
+    assert client.get('/media/missing.mp4').status_code == 404
+    assert client.get('/media/../clip one.mp4').status_code == 404
+
+
+def test_accel_redirect_path_is_quoted(client):
+    response = client.get('/accel/clip one.mp4')
+    assert response.headers['X-Accel-Redirect'] == '/protected/clip%20one.mp4'
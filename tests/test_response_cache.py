@@ -0,0 +1,36 @@
+from utils.response_cache import ResponseCache, make_etag
+
+
+def test_get_or_create_builds_once_per_key():
+    cache = ResponseCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        return b'{"images": []}'
+
+    first = cache.get_or_create(('images', 'v1', 1, 9), build)
+    second = cache.get_or_create(('images', 'v1', 1, 9), build)
+    assert first is second
+    assert len(calls) == 1
+    assert first.etag == make_etag(b'{"images": []}')
+
+
+def test_new_version_gets_a_new_entry():
+    cache = ResponseCache()
+    old = cache.get_or_create(('images', 'v1', 1, 9), lambda: b'old')
+    new = cache.get_or_create(('images', 'v2', 1, 9), lambda: b'new')
+    assert old.body == b'old'
+    assert new.body == b'new'
+    assert old.etag != new.etag
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(maxsize=2)
+    cache.get_or_create('a', lambda: b'a')
+    cache.get_or_create('b', lambda: b'b')
+    cache.get('a')
+    cache.get_or_create('c', lambda: b'c')
+    assert len(cache) == 2
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Video Rendition Tool
+
+This script transcodes the gallery videos into faststart, size-capped
+renditions (480p/720p) for progressive playback on slow connections.
+"""
+
+import sys
+from utils.video_transcoder import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+ASGI Adapter
+
+This module serves the Flask app from an ASGI server such as Uvicorn.
+Views run in a small thread pool and only for as long as it takes to
+produce the response; the body is then sent from the event loop, with file
+reads done in the pool one chunk at a time. A slow client downloading a
+video or waiting on a gallery response holds a coroutine instead of a
+thread, so one process can keep hundreds of connections open.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.wsgi import FileWrapper
+
+# Bytes read from a file per event loop round trip
+CHUNK_SIZE = 64 * 1024
+
+
+class FileStream(FileWrapper):
+    """
+    File wrapper handed to the app as ``wsgi.file_wrapper``
+
+    The adapter recognizes it and reads the file in the thread pool instead
+    of iterating it on the event loop.
+    """
+
+    def __init__(self, file, buffer_size=CHUNK_SIZE):
+        super().__init__(file, max(buffer_size, CHUNK_SIZE))
+
+
+def build_environ(scope, body):
+    """
+    Build a WSGI environ from an ASGI HTTP scope
+
+    Args:
+        scope (dict): ASGI connection scope
+        body (bytes): Complete request body
+
+    Returns:
+        dict: WSGI environ
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        # WSGI carries the path as the raw bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': FileStream,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiAdapter:
+    """
+    ASGI application wrapping a WSGI application
+
+    Args:
+        wsgi_app (callable): WSGI application (e.g. the Flask app)
+        threads (int): Size of the thread pool running the views and the
+            file reads
+    """
+
+    def __init__(self, wsgi_app, threads=8):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+
+    async def handle_lifespan(self, receive, send):
+        """Acknowledge startup and release the thread pool on shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def run(self, func, *args):
+        """Run a blocking call in the thread pool."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def start(self, environ):
+        """
+        Call the WSGI app and fetch the first body chunk (in the thread pool)
+
+        Returns:
+            tuple: (status, headers, body iterable, iterator over the
+            rest of the body or None, first chunk or None)
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = status
+            response['headers'] = headers
+
+        result = self.wsgi_app(environ, start_response)
+        iterator = first = None
+        if not isinstance(result, (FileStream, list, tuple)):
+            # Apps may call start_response lazily, on the first iteration
+            iterator = iter(result)
+            first = next(iterator, None)
+        return response['status'], response['headers'], result, iterator, first
+
+    async def handle_http(self, scope, receive, send):
+        """Read the request, run the app and stream the response."""
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        environ = build_environ(scope, b''.join(body))
+        status, headers, result, iterator, first = await self.run(self.start, environ)
+
+        # Stop sending once the client goes away
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            })
+            async for chunk in self.iter_body(result, iterator, first):
+                if disconnected.is_set():
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            if hasattr(result, 'close'):
+                await self.run(result.close)
+
+    async def iter_body(self, result, iterator, first):
+        """Yield the body chunks, doing any blocking reads in the thread pool."""
+        if isinstance(result, (list, tuple)):
+            for chunk in result:
+                yield chunk
+        elif isinstance(result, FileStream):
+            while True:
+                chunk = await self.run(result.file.read, result.buffer_size)
+                if not chunk:
+                    return
+                yield chunk
+        elif first is not None:
+            yield first
+            while True:
+                chunk = await self.run(next, iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
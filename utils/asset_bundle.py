@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Static Asset Bundler
+
+This script writes content-hashed copies of the static files (CSS, JS and
+everything under static/assets) to a dist directory, together with
+precompressed ``.br``/``.gz`` siblings for text formats and a manifest that
+maps each original path to its fingerprinted file. Because a fingerprinted
+URL changes whenever the content does, its responses can be cached for a
+year.
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import posixpath
+import time
+import shutil
+import argparse
+from pathlib import Path
+
+try:
+    from utils.build_cache import BuildCache, DEFAULT_CACHE_FILE, file_digest, instance_path
+    from utils.media_catalog import save_catalog_snapshot
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from build_cache import BuildCache, DEFAULT_CACHE_FILE, file_digest, instance_path
+    from media_catalog import save_catalog_snapshot
+
+BUNDLE_MANIFEST = 'manifest.json'
+BUNDLE_DIR = 'dist'
+# Directories under static/ that are not bundled: the bundle itself, and
+# videos, which are served with byte-range support from /media/videos
+EXCLUDED_DIRS = {BUNDLE_DIR, os.path.join('assets', 'videos')}
+# Formats worth precompressing; images and videos are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.vtt', '.txt', '.xml', '.html', '.ico', '.map'}
+# Keep a precompressed copy only if it saves at least this fraction
+MIN_COMPRESSION_SAVING = 0.05
+HASH_LENGTH = 10
+# Encodings in order of preference, with their file suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CSS_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def brotli_supported():
+    """Return True if the optional ``brotli`` package is installed."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compress(data, encoding):
+    """Compress bytes with the highest compression level of an encoding."""
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def fingerprinted_name(relpath, digest):
+    """Insert a content hash before the extension: css/style.css -> css/style.<hash>.css"""
+    stem, ext = os.path.splitext(relpath)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def rewrite_css_urls(css, relpath, files):
+    """
+    Point the relative url() references of a stylesheet at bundled files
+
+    Args:
+        css (str): Stylesheet source
+        relpath (str): Path of the stylesheet relative to the static folder
+        files (dict): Manifest entries of the files bundled so far
+
+    Returns:
+        str: The stylesheet with fingerprinted URLs
+    """
+    base = posixpath.dirname(relpath)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        # Keep a query string or fragment (e.g. font.eot?#iefix) as it is
+        path, rest = re.match(r'([^?#]*)(.*)', url).groups()
+        entry = files.get(posixpath.normpath(posixpath.join(base, path)))
+        if entry is None:
+            return match.group(0)
+        return f"url({quote}{posixpath.relpath(entry['file'], base or '.')}{rest}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+
+def bundle_file(source_path, relpath, digest, output_dir, encodings, data=None):
+    """
+    Copy a file to its fingerprinted name and write precompressed siblings
+
+    Args:
+        source_path (str): Path to the source file
+        relpath (str): Path of the file relative to the static folder
+        digest (str): SHA-256 hex digest of the file content
+        output_dir (str): Bundle directory
+        encodings (tuple): Encodings to precompress with ('br', 'gzip')
+        data (bytes): Content to write instead of the source file
+
+    Returns:
+        dict: Manifest entry with the fingerprinted ``file`` and the
+        ``encodings`` written next to it
+    """
+    hashed = fingerprinted_name(relpath, digest)
+    target = Path(output_dir) / hashed
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if data is not None:
+        target.write_bytes(data)
+    else:
+        # A hard link would change along with the source, so always copy
+        shutil.copyfile(source_path, target)
+
+    written = []
+    if Path(relpath).suffix.lower() in COMPRESSIBLE_EXTENSIONS:
+        data = target.read_bytes()
+        for encoding, suffix in ENCODINGS:
+            if encoding not in encodings:
+                continue
+            compressed = compress(data, encoding)
+            if len(compressed) <= len(data) * (1 - MIN_COMPRESSION_SAVING):
+                Path(f"{target}{suffix}").write_bytes(compressed)
+                written.append(encoding)
+    return {'file': hashed, 'encodings': written}
+
+
+def entry_files(entry):
+    """Return the files written for a manifest entry, relative to the bundle."""
+    suffixes = dict(ENCODINGS)
+    return [entry['file']] + [f"{entry['file']}{suffixes[encoding]}" for encoding in entry['encodings']]
+
+
+def entry_outputs(output_dir, entry):
+    """Return the paths of the files written for a manifest entry."""
+    return [Path(output_dir) / filename for filename in entry_files(entry)]
+
+
+def iter_static_files(static_folder):
+    """Yield the paths, relative to the static folder, of all files to bundle."""
+    for root, dirs, files in os.walk(static_folder):
+        reldir = os.path.relpath(root, static_folder)
+        dirs[:] = sorted(
+            d for d in dirs
+            if not d.startswith('.') and os.path.normpath(os.path.join(reldir, d)) not in EXCLUDED_DIRS
+        )
+        for filename in sorted(files):
+            if not filename.startswith('.'):
+                yield os.path.normpath(os.path.join(reldir, filename))
+
+
+def build_bundle(static_folder, output_dir=None, cache=None):
+    """
+    Fingerprint and precompress all static files and write the manifest
+
+    The outputs of the previous build are kept, so pages rendered before
+    a deploy can still load their assets; older outputs are removed.
+
+    Args:
+        static_folder (str): Flask static folder
+        output_dir (str): Bundle directory (default: ``<static>/dist``)
+        cache (BuildCache): Skip files whose bundle outputs are up to date
+
+    Returns:
+        dict: The manifest that was written
+    """
+    output_dir = Path(output_dir or os.path.join(static_folder, BUNDLE_DIR))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        with open(output_dir / BUNDLE_MANIFEST) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    encodings = tuple(encoding for encoding, _ in ENCODINGS if encoding != 'br' or brotli_supported())
+    if 'br' not in encodings:
+        print("brotli is not installed, writing gzip variants only (pip install brotli)")
+    params = {'encodings': list(encodings), 'hash_length': HASH_LENGTH}
+
+    start = time.perf_counter()
+    files = {}
+    built = 0
+    # Stylesheets go last, so their url() references can be rewritten to
+    # the fingerprinted files; they are small and always rebuilt
+    for relpath in sorted(iter_static_files(static_folder), key=lambda path: path.endswith('.css')):
+        source_path = os.path.join(static_folder, relpath)
+        if relpath.endswith('.css'):
+            with open(source_path, encoding='utf-8') as f:
+                data = rewrite_css_urls(f.read(), relpath.replace(os.sep, '/'), files).encode('utf-8')
+            entry = bundle_file(source_path, relpath, hashlib.sha256(data).hexdigest(), output_dir, encodings, data)
+            files[relpath.replace(os.sep, '/')] = entry
+            continue
+
+        if cache is not None:
+            entry = cache.get_data('bundle', source_path)
+            if entry and cache.is_fresh('bundle', source_path, params, entry_outputs(output_dir, entry)):
+                files[relpath.replace(os.sep, '/')] = entry
+                continue
+
+        entry = bundle_file(source_path, relpath, file_digest(source_path), output_dir, encodings)
+        files[relpath.replace(os.sep, '/')] = entry
+        built += 1
+        if cache is not None:
+            cache.record('bundle', source_path, params, entry_outputs(output_dir, entry), data=entry)
+
+    if cache is not None:
+        cache.save()
+
+    # Keep the outputs of the previous build next to the current ones; an
+    # unchanged bundle carries over the outputs it retained before
+    current = {filename for entry in files.values() for filename in entry_files(entry)}
+    if files == previous.get('files'):
+        retained = set(previous.get('retained', []))
+    else:
+        retained = {filename for entry in previous.get('files', {}).values() for filename in entry_files(entry)}
+    retained -= current
+    keep = current | retained | {BUNDLE_MANIFEST}
+    removed = 0
+    for root, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if Path(os.path.relpath(path, output_dir)).as_posix() not in keep:
+                os.remove(path)
+                removed += 1
+
+    manifest = {'files': files, 'retained': sorted(retained)}
+    tmp_path = output_dir / f".{BUNDLE_MANIFEST}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, output_dir / BUNDLE_MANIFEST)
+
+    print(f"Bundled {len(files)} files ({built} rebuilt, {removed} old outputs removed) "
+          f"in {time.perf_counter() - start:.2f}s to {output_dir}")
+    return manifest
+
+
+class AssetBundle:
+    """
+    Lookup of the fingerprinted files listed in the bundle manifest
+
+    The manifest is read once at startup; without one, ``url`` returns None
+    and callers fall back to the plain static URLs.
+    """
+
+    def __init__(self, static_folder, url_prefix='/dist'):
+        self.directory = os.path.join(static_folder, BUNDLE_DIR)
+        self.url_prefix = url_prefix
+        self.files = {}
+        self.encodings = {}
+        # Digest of the manifest, so pages rendered with other asset URLs
+        # can be told apart
+        self.version = None
+
+        try:
+            with open(os.path.join(self.directory, BUNDLE_MANIFEST), 'rb') as f:
+                raw = f.read()
+            manifest = json.loads(raw)
+        except (OSError, ValueError):
+            return
+
+        self.version = hashlib.sha1(raw).hexdigest()[:16]
+
+        for relpath, entry in manifest.get('files', {}).items():
+            self.files[relpath] = entry['file']
+            self.encodings[entry['file']] = entry['encodings']
+
+    def url(self, filename):
+        """Return the fingerprinted URL of a static file, or None if it is not bundled."""
+        hashed = self.files.get(filename)
+        return f"{self.url_prefix}/{hashed}" if hashed else None
+
+    def negotiate(self, hashed, accept_encoding):
+        """
+        Pick the precompressed variant of a bundled file
+
+        Args:
+            hashed (str): Fingerprinted file path, relative to the bundle
+            accept_encoding (werkzeug.datastructures.Accept): The
+                request's parsed Accept-Encoding header
+
+        Returns:
+            tuple: (filename to send, Content-Encoding or None)
+        """
+        for encoding, suffix in ENCODINGS:
+            if encoding in self.encodings.get(hashed, ()) and accept_encoding[encoding]:
+                return f"{hashed}{suffix}", encoding
+        return hashed, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fingerprinted, precompressed static asset bundle")
+    parser.add_argument('--static', default='static', help="Static folder to bundle (default: static)")
+    parser.add_argument('--output', help="Bundle directory (default: <static>/dist)")
+    parser.add_argument('--cache',
+                        help="Build manifest used to skip unchanged files (default: instance/build-cache.json next to --static)")
+    parser.add_argument('--force', action='store_true', help="Rebuild all files, ignoring the build manifest")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.static):
+        print(f"Error: Directory {args.static} does not exist")
+        return 1
+
+    cache = BuildCache(args.cache or instance_path(args.static, DEFAULT_CACHE_FILE), force=args.force)
+    build_bundle(args.static, args.output, cache)
+    # The gallery items point at the fingerprinted files of this build
+    save_catalog_snapshot(os.path.join(args.static, 'assets'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Batch Runner
+
+This module runs a function over many files, either serially or on a pool
+of worker processes, and aggregates the per-file results into a report.
+With a per-item timeout, every item runs in its own bounded worker process
+so a hung item can be killed without stalling the rest of the batch.
+"""
+
+import multiprocessing
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import wait
+
+# Outcome of a single batch item
+BatchResult = namedtuple('BatchResult', ['item', 'ok', 'value', 'error', 'seconds'])
+
+
+def resolve_jobs(jobs):
+    """Return the number of workers to use (0 or None means one per CPU core)."""
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _run_item(func, item, args):
+    """Run func on one item, capturing its result, error and duration."""
+    start = time.perf_counter()
+    try:
+        value = func(item, *args)
+        return BatchResult(item, True, value, None, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(item, False, None, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+
+
+def _run_child(conn, func, item, args):
+    """Worker process entry point: run one item and send back its result."""
+    try:
+        conn.send(_run_item(func, item, args))
+    finally:
+        conn.close()
+
+
+def _run_with_timeouts(func, items, args, jobs, timeout, progress):
+    """Run each item in its own process, at most ``jobs`` at a time."""
+    context = multiprocessing.get_context()
+    total = len(items)
+    results = [None] * total
+    pending = deque(enumerate(items))
+    running = {}  # connection -> (index, process, start time)
+    done = 0
+
+    def finish(idx, result):
+        nonlocal done
+        results[idx] = result
+        done += 1
+        if progress:
+            progress(done, total, result)
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            idx, item = pending.popleft()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_child, args=(sender, func, item, args), daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (idx, process, time.perf_counter())
+
+        now = time.perf_counter()
+        next_deadline = min(start + timeout for _, _, start in running.values())
+        for conn in wait(list(running), timeout=max(0.0, next_deadline - now)):
+            idx, process, start = running.pop(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                process.join()
+                result = BatchResult(items[idx], False, None,
+                                     f"Worker exited with code {process.exitcode}", time.perf_counter() - start)
+            conn.close()
+            process.join()
+            finish(idx, result)
+
+        now = time.perf_counter()
+        for conn, (idx, process, start) in list(running.items()):
+            if now - start >= timeout:
+                process.terminate()
+                process.join()
+                conn.close()
+                del running[conn]
+                finish(idx, BatchResult(items[idx], False, None, f"Timed out after {timeout:g}s", now - start))
+
+    return results
+
+
+def run_batch(func, items, args=(), jobs=1, progress=None, timeout=None):
+    """
+    Run a function over a list of items
+
+    Args:
+        func (callable): Top-level function called as ``func(item, *args)``;
+            it must be picklable when ``jobs`` is greater than 1 or a
+            ``timeout`` is set
+        items (list): Items to process
+        args (tuple): Extra positional arguments passed to ``func``
+        jobs (int): Number of worker processes (1 runs in this process)
+        progress (callable): Called with ``(done, total, result)`` as each
+            item finishes
+        timeout (float): Seconds after which a single item is killed and
+            reported as failed; items then always run in worker processes
+
+    Returns:
+        list: BatchResult objects in the order of ``items``
+    """
+    items = list(items)
+    total = len(items)
+    results = [None] * total
+    jobs = min(resolve_jobs(jobs), total) if total else 1
+
+    if timeout and total:
+        return _run_with_timeouts(func, items, args, jobs, timeout, progress)
+
+    if jobs <= 1:
+        for idx, item in enumerate(items):
+            results[idx] = _run_item(func, item, args)
+            if progress:
+                progress(idx + 1, total, results[idx])
+        return results
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_run_item, func, item, args): idx for idx, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed by the OS)
+                results[idx] = BatchResult(items[idx], False, None, f"{type(e).__name__}: {e}", 0.0)
+            if progress:
+                progress(done, total, results[idx])
+
+    return results
+
+
+def print_progress(done, total, result):
+    """Default progress callback printing one line per finished item."""
+    status = 'ok' if result.ok else 'FAILED'
+    print(f"[{done}/{total}] {status} {result.item} ({result.seconds:.2f}s)")
+
+
+def print_batch_report(results, elapsed, jobs=1, label='files'):
+    """
+    Print a throughput summary and a deterministic failure report
+
+    Args:
+        results (list): BatchResult objects
+        elapsed (float): Wall time of the batch in seconds
+        jobs (int): Number of workers used
+        label (str): Name of the processed items
+    """
+    total = len(results)
+    failures = sorted((r for r in results if not r.ok), key=lambda r: str(r.item))
+    busy = sum(r.seconds for r in results)
+    rate = total / elapsed if elapsed > 0 else 0.0
+
+    print(f"Processed {total} {label} in {elapsed:.2f}s with {jobs} worker(s): "
+          f"{rate:.1f} {label}/s, {busy:.2f}s of work ({busy / elapsed if elapsed > 0 else 0:.1f}x parallelism)")
+    if failures:
+        print(f"{len(failures)} {label} failed:")
+        for result in failures:
+            print(f"  {result.item}: {result.error}")
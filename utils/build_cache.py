@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Incremental Build Cache
+
+This module keeps a persistent JSON manifest of generated assets, keyed by
+source file and task. An output is only rebuilt when its source content or
+its encoding parameters changed, or when an output file went missing.
+"""
+
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_FILE = 'build-cache.json'
+CACHE_FORMAT = 1
+# Flask's instance folder, next to the static folder: build state the app
+# reads but never serves under /static
+INSTANCE_FOLDER = 'instance'
+
+
+def find_static_folder(path):
+    """
+    Return the static folder an asset path belongs to
+
+    The build tools take asset directories such as ``static/assets/images``;
+    the static folder is the parent of their ``assets`` directory.
+
+    Returns:
+        str: Absolute path of the static folder, or None if the path is not
+        inside an ``assets`` directory
+    """
+    path = os.path.abspath(path)
+    while True:
+        if os.path.basename(path) == 'assets':
+            return os.path.dirname(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def instance_path(static_folder, filename):
+    """Return the path of a file in the instance folder of the app serving static_folder."""
+    return os.path.join(os.path.dirname(os.path.abspath(static_folder)), INSTANCE_FOLDER, filename)
+
+
+def default_cache_path(asset_dir):
+    """
+    Return the build cache of the app an asset directory belongs to
+
+    Returns:
+        str: ``instance/build-cache.json`` next to the static folder, or
+        None if the directory is not inside a static/assets directory
+    """
+    static_folder = find_static_folder(asset_dir)
+    if static_folder is None:
+        print(f"Not using a build cache: {asset_dir} is not inside a static/assets directory, pass --cache")
+        return None
+    return instance_path(static_folder, DEFAULT_CACHE_FILE)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Persistent record of which outputs were built from which sources
+
+    Sources are first compared by size and mtime; only when those changed
+    is the content hashed, so a touched but unchanged file is not rebuilt
+    and a no-op run costs one stat per source and output.
+
+    With ``force=True`` every source is reported as stale, and the rebuilt
+    outputs are recorded again.
+
+    Usage:
+        cache = BuildCache('instance/build-cache.json')
+        if not cache.is_fresh('thumbnail', src, params, [dst]):
+            build(src, dst)
+            cache.record('thumbnail', src, params, [dst])
+        cache.save()
+    """
+
+    def __init__(self, path, force=False):
+        self.path = os.path.abspath(path)
+        self.base_dir = os.path.dirname(self.path)
+        self.force = force
+        self.entries = {}
+        self.dirty = False
+        self._digests = {}
+
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('format') == CACHE_FORMAT:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def _key(self, task, source):
+        return f"{task}:{os.path.relpath(os.path.abspath(source), self.base_dir)}"
+
+    def _digest(self, source, stat):
+        """Hash a source once per run, keyed by its size and mtime."""
+        key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            self._digests[key] = file_digest(source)
+        return self._digests[key]
+
+    def is_fresh(self, task, source, params, outputs, adopt_existing=False):
+        """
+        Check whether the outputs of a source are up to date
+
+        Args:
+            task (str): Name of the build step (e.g. 'thumbnail')
+            source (str): Path to the source file
+            params (dict): Encoding parameters (JSON-serializable)
+            outputs (list): Paths of the generated files
+            adopt_existing (bool): Trust outputs built before the cache
+                existed if they are newer than the source
+
+        Returns:
+            bool: True if nothing needs to be rebuilt
+        """
+        if self.force:
+            return False
+        entry = self.entries.get(self._key(task, source))
+        if entry is None and adopt_existing and outputs:
+            try:
+                source_mtime = os.stat(source).st_mtime_ns
+                if all(os.stat(output).st_mtime_ns >= source_mtime for output in outputs):
+                    self.record(task, source, params, outputs)
+                    return True
+            except OSError:
+                pass
+            return False
+        if entry is None or entry['params'] != params:
+            return False
+        if not all(os.path.exists(output) for output in outputs):
+            return False
+
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return False
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+
+        # Size or mtime changed: compare the content before rebuilding
+        if stat.st_size != entry['size'] or self._digest(source, stat) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, task, source, params, outputs, data=None):
+        """
+        Record that the outputs were built from the current source
+
+        Args:
+            task (str): Name of the build step
+            source (str): Path to the source file
+            params (dict): Encoding parameters (JSON-serializable)
+            outputs (list): Paths of the generated files
+            data (dict): Extra metadata to keep with the entry
+        """
+        stat = os.stat(source)
+        self.entries[self._key(task, source)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self._digest(source, stat),
+            'params': params,
+            'outputs': [os.path.relpath(os.path.abspath(output), self.base_dir) for output in outputs],
+            'data': data,
+        }
+        self.dirty = True
+
+    def get_data(self, task, source):
+        """Return the extra metadata recorded for a source, or None."""
+        entry = self.entries.get(self._key(task, source))
+        return entry.get('data') if entry else None
+
+    def save(self):
+        """Write the manifest atomically if anything changed."""
+        if not self.dirty:
+            return
+        os.makedirs(self.base_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': CACHE_FORMAT, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
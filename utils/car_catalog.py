@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Car Catalog
+
+This module loads the rental fleet from ``data/cars.json`` once per worker
+and serves the car listing, the API filters and the pre-rendered card
+fragments from memory.
+
+The file's modification time is checked at most once per refresh interval;
+when it changes, the catalog is reloaded and the cached fragments are
+dropped, so editing the file is enough to add, change or remove a car.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRANSMISSIONS = {'manual', 'automatic'}
+# Car field each API filter compares against
+FILTER_FIELDS = {
+    'seats': 'seats',
+    'transmission': 'transmission',
+    'min_price': 'price_per_day',
+    'max_price': 'price_per_day',
+}
+
+
+def load_cars(path):
+    """
+    Load and validate the car catalog file
+
+    Args:
+        path (str): Path to the JSON catalog
+
+    Returns:
+        tuple: (cars, featured ids, raw file bytes)
+
+    Raises:
+        ValueError: If the file is not a valid catalog
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+
+    cars = data.get('cars', [])
+    ids = set()
+    for car in cars:
+        missing = {'id', 'name', 'image', 'capacity', 'seats'} - car.keys()
+        if missing:
+            raise ValueError(f"Car {car.get('id', '?')} is missing {', '.join(sorted(missing))}")
+        if car['id'] in ids:
+            raise ValueError(f"Duplicate car id {car['id']}")
+        if car.get('transmission') not in TRANSMISSIONS | {None}:
+            raise ValueError(f"Car {car['id']} has an unknown transmission {car['transmission']!r}")
+        ids.add(car['id'])
+
+    featured = [car_id for car_id in data.get('featured', []) if car_id in ids]
+    return cars, featured, raw
+
+
+class CarCatalog:
+    """
+    In-memory rental fleet with a per-version fragment cache
+
+    ``version`` is a digest of the catalog file, so every worker that loaded
+    the same file agrees on it and it can key HTTP and fragment caches.
+    """
+
+    def __init__(self, path, refresh_interval=5.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.cars = []
+        self.featured = []
+        self.version = None
+        # Filterable fields that at least one car has a value for
+        self.fields = set()
+
+        self._by_id = {}
+        self._fragments = {}
+        self._mtime = None
+        self._last_check = 0.0
+        self._refresh_lock = threading.Lock()
+
+        self.reload()
+
+    def reload(self):
+        """Load the catalog file, keeping the current fleet if it is invalid."""
+        self._last_check = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            cars, featured, raw = load_cars(self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading car catalog {self.path}: {e}")
+            return False
+
+        self._mtime = mtime
+        self.cars = cars
+        self.featured = featured
+        self._by_id = {car['id']: car for car in cars}
+        self.fields = {
+            field for field in FILTER_FIELDS.values()
+            if any(car.get(field) is not None for car in cars)
+        }
+        self._fragments = {}
+        self.version = hashlib.sha1(raw).hexdigest()[:16]
+        return True
+
+    def refresh_if_stale(self):
+        """
+        Reload the catalog if the file changed
+
+        Returns:
+            bool: True if the catalog was reloaded
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return False
+            return mtime != self._mtime and self.reload()
+        finally:
+            self._refresh_lock.release()
+
+    @property
+    def featured_cars(self):
+        """Cars highlighted on the homepage, in their configured order."""
+        return [self._by_id[car_id] for car_id in self.featured]
+
+    @property
+    def booking_options(self):
+        """Car names for the booking form: featured cars first, then the rest."""
+        featured = set(self.featured)
+        return [car['name'] for car in self.featured_cars + [car for car in self.cars if car['id'] not in featured]]
+
+    def unavailable_filters(self, **filters):
+        """
+        Return the given filters on fields no car has a value for
+
+        Such a filter could only ever match nothing, so the API rejects it
+        until the catalog lists the field.
+        """
+        return [
+            name for name, value in filters.items()
+            if value is not None and FILTER_FIELDS[name] not in self.fields
+        ]
+
+    def filter(self, seats=None, transmission=None, min_price=None, max_price=None):
+        """
+        Select the cars matching all given criteria
+
+        Args:
+            seats (int): Minimum number of passengers the car must carry
+            transmission (str): 'manual' or 'automatic'
+            min_price (int): Lowest daily price; cars without a listed
+                price are excluded when a price bound is given
+            max_price (int): Highest daily price
+
+        Returns:
+            list: Matching cars in catalog order
+        """
+        cars = self.cars
+        if seats is not None:
+            cars = [car for car in cars if car['seats'] >= seats]
+        if transmission is not None:
+            cars = [car for car in cars if car.get('transmission') == transmission]
+        if min_price is not None or max_price is not None:
+            cars = [
+                car for car in cars
+                if car.get('price_per_day') is not None
+                and (min_price is None or car['price_per_day'] >= min_price)
+                and (max_price is None or car['price_per_day'] <= max_price)
+            ]
+        return cars
+
+    def fragment(self, name, render):
+        """
+        Return a pre-rendered fragment, rendering it once per catalog version
+
+        Args:
+            name (str): Fragment name (e.g. 'all-cars')
+            render (callable): Called with the catalog to render the fragment
+
+        Returns:
+            The cached result of ``render``
+        """
+        fragments = self._fragments
+        if name not in fragments:
+            fragments[name] = render(self)
+        return fragments[name]
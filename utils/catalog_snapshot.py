@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Catalog Snapshot
+
+This module writes a catalog to a compact binary file and reads it back
+through a read-only memory mapping. Worker processes that map the same
+snapshot share its pages through the OS page cache, and a list item is only
+decoded when a request slices it, so a freshly spawned worker answers its
+first gallery request without scanning the asset directories or building
+any items.
+
+Layout (little-endian):
+    magic (8 bytes), format (uint32), header length (uint32),
+    header (JSON: the catalog state and the section table), then per
+    section the uint32 end offsets of its items followed by the items as
+    compact JSON.
+"""
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+
+MAGIC = b'RCSNAP\r\n'
+SNAPSHOT_FORMAT = 1
+PREFIX = struct.Struct('<8sII')
+OFFSET = struct.Struct('<I')
+OFFSET_PAIR = struct.Struct('<II')
+
+
+class SnapshotSequence(Sequence):
+    """
+    Read-only list of JSON items stored in a snapshot section
+
+    Items are decoded on access and every access returns a new object.
+    """
+
+    def __init__(self, buffer, table, count):
+        self._buffer = buffer
+        self._table = table
+        # The items follow the count + 1 offsets of the table
+        self._data = table + OFFSET.size * (count + 1)
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('snapshot index out of range')
+        start, end = OFFSET_PAIR.unpack_from(self._buffer, self._table + OFFSET.size * index)
+        return json.loads(self._buffer[self._data + start:self._data + end])
+
+
+def write_snapshot(path, state, sections):
+    """
+    Write a snapshot file atomically
+
+    Args:
+        path (str): Snapshot file
+        state (dict): JSON-serializable data decoded when the snapshot is opened
+        sections (dict): Lists of JSON-serializable items by section name,
+            decoded one item at a time
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    body = bytearray()
+    table = {}
+    for name, items in sections.items():
+        encoded = [json.dumps(item, separators=(',', ':')).encode('utf-8') for item in items]
+        table[name] = [len(body), len(encoded)]
+        end = 0
+        body += OFFSET.pack(end)
+        for item in encoded:
+            end += len(item)
+            body += OFFSET.pack(end)
+        for item in encoded:
+            body += item
+
+    header = json.dumps({'state': state, 'sections': table}, separators=(',', ':')).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, SNAPSHOT_FORMAT, len(header)))
+        f.write(header)
+        f.write(body)
+    # Workers that mapped the previous file keep reading it until they reload
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Memory-mapped snapshot file
+
+    Args:
+        path (str): Snapshot file
+
+    Raises:
+        OSError: If the file cannot be opened or mapped
+        ValueError: If it is not a snapshot of the supported format
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.buffer) < PREFIX.size:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        magic, fmt, header_length = PREFIX.unpack_from(self.buffer)
+        if magic != MAGIC or fmt != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a format {SNAPSHOT_FORMAT} catalog snapshot")
+
+        header = json.loads(self.buffer[PREFIX.size:PREFIX.size + header_length])
+        self.state = header['state']
+        self._base = PREFIX.size + header_length
+        self._sections = header['sections']
+
+    def section(self, name):
+        """Return the items of a section as a SnapshotSequence."""
+        offset, count = self._sections[name]
+        return SnapshotSequence(self.buffer, self._base + offset, count)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Stylesheet Builder
+
+This script replaces the stylesheets that used to be loaded from CDNs with
+local, purged builds:
+
+- Tailwind CSS: the Tailwind CLI scans the templates and static/js/main.js
+  and writes a minified stylesheet with only the utilities in use, instead
+  of compiling them in the browser with the Play CDN.
+- Font Awesome: only the rules of the icons and helper classes in use are
+  kept, and the webfonts are subset to those glyphs.
+"""
+
+import os
+import re
+import sys
+import glob
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+
+try:
+    from utils.asset_bundle import brotli_supported
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from asset_bundle import brotli_supported
+
+# Files scanned for class names
+CONTENT_GLOBS = ('templates/*.html', 'templates/partials/*.html', 'static/js/main.js')
+TAILWIND_OUTPUT = 'static/css/tailwind.min.css'
+# The Play CDN runs Tailwind v3; v4 renames several utilities
+TAILWIND_VERSION = '3.4.17'
+ICONS_OUTPUT = 'static/css/icons.min.css'
+WEBFONT_DIR = 'static/webfonts'
+
+# Font Awesome style classes and the stylesheet/webfont providing them
+ICON_STYLES = {
+    'solid': ({'fas', 'fa-solid'}, 'fa-solid-900'),
+    'regular': ({'far', 'fa-regular'}, 'fa-regular-400'),
+    'brands': ({'fab', 'fa-brands'}, 'fa-brands-400'),
+}
+ICON_CLASS_PATTERN = re.compile(r'(?<![\w-])(fa[srb]?|fa-[a-z0-9-]+)(?![\w-])')
+CSS_CLASS_PATTERN = re.compile(r'\.([\w-]+)')
+CSS_CONTENT_PATTERN = re.compile(r'content:\s*"\\([0-9a-fA-F]+)"')
+
+
+def content_files(root='.', globs=CONTENT_GLOBS):
+    """Return the files scanned for class names, relative to root."""
+    return sorted(path for pattern in globs for path in glob.glob(os.path.join(root, pattern)))
+
+
+def find_tailwind(binary=None):
+    """
+    Locate the Tailwind CLI
+
+    Args:
+        binary (str): Explicit path to a Tailwind standalone executable
+
+    Returns:
+        list: Command prefix to run the CLI, or None if it is not available
+    """
+    if binary:
+        return [binary]
+    if shutil.which('tailwindcss'):
+        return ['tailwindcss']
+    if shutil.which('npx'):
+        return ['npx', '--yes', f"tailwindcss@{TAILWIND_VERSION}"]
+    return None
+
+
+def build_tailwind(command, files, output_path=TAILWIND_OUTPUT):
+    """
+    Build the purged, minified Tailwind stylesheet
+
+    Without an input file the CLI emits Tailwind's base, components and
+    utilities layers, like the Play CDN does.
+
+    Args:
+        command (list): Command prefix returned by find_tailwind
+        files (list): Files scanned for class names
+        output_path (str): Path of the stylesheet
+
+    Returns:
+        bool: True on success
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    cmd = command + ['--content', ','.join(files), '--output', output_path, '--minify']
+    try:
+        subprocess.run(cmd, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error building Tailwind CSS: {e}")
+        return False
+    print(f"Built {output_path} ({os.path.getsize(output_path) / 1024:.1f} KB)")
+    return True
+
+
+def used_icon_classes(files):
+    """Return the Font Awesome class names (fas, fa-car, ...) found in files."""
+    classes = set()
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            classes.update(ICON_CLASS_PATTERN.findall(f.read()))
+    return classes
+
+
+def parse_css(css):
+    """
+    Split a stylesheet into top-level blocks
+
+    Returns:
+        list: (prelude, body) tuples; the body of an at-rule holding rules
+        (e.g. @media) is a nested list of blocks
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks = []
+    pos = 0
+    while True:
+        start = css.find('{', pos)
+        if start < 0:
+            return blocks
+        prelude = css[pos:start].strip()
+        depth, end = 1, start + 1
+        while depth:
+            depth += {'{': 1, '}': -1}.get(css[end], 0)
+            end += 1
+        body = css[start + 1:end - 1]
+        if prelude.startswith(('@media', '@supports')):
+            body = parse_css(body)
+        blocks.append((prelude, body))
+        pos = end
+
+
+def minify_block(prelude, body):
+    """Serialize a block with insignificant whitespace removed."""
+    if isinstance(body, list):
+        body = ''.join(minify_block(*block) for block in body)
+    else:
+        body = re.sub(r'\s*([:;,])\s*', r'\1', ' '.join(body.split())).rstrip(';')
+    prelude = re.sub(r'\s*,\s*', ',', ' '.join(prelude.split()))
+    return f"{prelude}{{{body}}}"
+
+
+def filter_rules(blocks, used):
+    """
+    Keep the rules whose selectors only use classes from ``used``
+
+    Selector lists are narrowed to the used selectors; @keyframes are kept
+    when a kept rule refers to them, and @font-face rules are dropped.
+    """
+    kept = []
+    keyframes = []
+    for prelude, body in blocks:
+        if isinstance(body, list):
+            inner = filter_rules(body, used)
+            if inner:
+                kept.append((prelude, inner))
+        elif prelude.startswith('@font-face'):
+            continue
+        elif prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+            keyframes.append((prelude, body))
+        else:
+            selectors = [
+                selector.strip() for selector in prelude.split(',')
+                if set(CSS_CLASS_PATTERN.findall(selector)) <= used
+            ]
+            if selectors:
+                kept.append((', '.join(selectors), body))
+
+    text = ''.join(body for _, body in kept if not isinstance(body, list))
+    kept.extend(block for block in keyframes if block[0].split()[-1] in text)
+    return kept
+
+
+def subset_font(source_path, output_path, codepoints, flavor):
+    """Write a copy of a font holding only the given codepoints."""
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = flavor
+    font = subset.load_font(source_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    subset.save_font(font, output_path, options)
+
+
+def build_icon_subset(files, css_output=ICONS_OUTPUT, font_dir=WEBFONT_DIR, fontawesome_dir=None):
+    """
+    Build the Font Awesome stylesheet and webfonts for the icons in use
+
+    Args:
+        files (list): Files scanned for icon classes
+        css_output (str): Path of the stylesheet
+        font_dir (str): Directory to save the subset webfonts
+        fontawesome_dir (str): Font Awesome Free distribution (the
+            directory holding css/ and webfonts/); defaults to the
+            ``fontawesomefree`` package
+
+    Returns:
+        bool: True on success
+    """
+    if fontawesome_dir is None:
+        try:
+            import fontawesomefree
+        except ImportError:
+            print("Error: Font Awesome sources not found (pip install fontawesomefree or pass --fontawesome-dir)")
+            return False
+        fontawesome_dir = os.path.join(os.path.dirname(fontawesomefree.__file__), 'static', 'fontawesomefree')
+    try:
+        import fontTools  # noqa: F401
+    except ImportError:
+        print("Error: fontTools is required to subset the icon fonts (pip install fonttools)")
+        return False
+
+    used = used_icon_classes(files)
+    styles = [style for style, (classes, _) in ICON_STYLES.items() if classes & used]
+
+    css_dir = Path(fontawesome_dir) / 'css'
+    blocks = parse_css((css_dir / 'fontawesome.css').read_text(encoding='utf-8'))
+    for style in styles:
+        blocks += parse_css((css_dir / f"{style}.css").read_text(encoding='utf-8'))
+    kept = filter_rules(blocks, used)
+
+    codepoints = set()
+    for _, body in kept:
+        if not isinstance(body, list):
+            codepoints.update(int(match, 16) for match in CSS_CONTENT_PATTERN.findall(body))
+
+    # woff2 needs brotli; fall back to zlib-compressed woff
+    flavor = 'woff2' if brotli_supported() else 'woff'
+    os.makedirs(font_dir, exist_ok=True)
+    font_url = Path(os.path.relpath(font_dir, os.path.dirname(css_output))).as_posix()
+    font_faces = []
+    for style in styles:
+        _, font_name = ICON_STYLES[style]
+        font_file = f"{font_name}.{flavor}"
+        subset_font(Path(fontawesome_dir) / 'webfonts' / f"{font_name}.ttf", os.path.join(font_dir, font_file),
+                    codepoints, flavor)
+        # Keep the family, weight and display of the original @font-face
+        for prelude, body in parse_css((css_dir / f"{style}.css").read_text(encoding='utf-8')):
+            if prelude.startswith('@font-face'):
+                body = re.sub(r'src:[^;]*', f'src: url("{font_url}/{font_file}") format("{flavor}")', body)
+                font_faces.append((prelude, body))
+
+    header = "/* Font Awesome Free subset - https://fontawesome.com/license/free " \
+             "(Icons: CC BY 4.0, Fonts: SIL OFL 1.1, Code: MIT License) */\n"
+    os.makedirs(os.path.dirname(css_output), exist_ok=True)
+    with open(css_output, 'w', encoding='utf-8') as f:
+        f.write(header + ''.join(minify_block(*block) for block in font_faces + kept) + '\n')
+
+    print(f"Built {css_output} with {len(codepoints)} icons ({', '.join(styles)}), "
+          f"{os.path.getsize(css_output) / 1024:.1f} KB")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build purged Tailwind and Font Awesome stylesheets")
+    parser.add_argument('--tailwind', help="Path to the Tailwind CLI (default: tailwindcss on PATH, then npx)")
+    parser.add_argument('--fontawesome-dir', help="Font Awesome Free distribution (default: fontawesomefree package)")
+    parser.add_argument('--skip-tailwind', action='store_true', help="Do not build the Tailwind stylesheet")
+    parser.add_argument('--skip-icons', action='store_true', help="Do not build the icon stylesheet")
+
+    args = parser.parse_args()
+
+    files = content_files()
+    if not files:
+        print("Error: No templates found, run this script from the project root")
+        return 1
+
+    ok = True
+    if not args.skip_tailwind:
+        command = find_tailwind(args.tailwind)
+        if command is None:
+            print(f"Error: Tailwind CLI not found. Install the v{TAILWIND_VERSION} standalone CLI as 'tailwindcss' "
+                  f"or Node.js for npx, or pass --tailwind")
+            ok = False
+        else:
+            ok &= build_tailwind(command, files)
+    if not args.skip_icons:
+        ok &= build_icon_subset(files, fontawesome_dir=args.fontawesome_dir)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,70 @@
 WebP Image Converter Utility
 
 This script converts images (JPG, PNG, etc.) to WebP format for optimization.
+It can also build responsive derivatives (several widths per source image)
+and a manifest describing them for use in srcset attributes.
 """
 
+import io
 import os
 import sys
+import json
+import time
+import base64
 from pathlib import Path
-from PIL import Image
+from PIL import Image, features
 import argparse
 
+try:
+    from utils.batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+    from utils.build_cache import BuildCache
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+    from build_cache import BuildCache
+
+# Widths generated for responsive images (srcset candidates)
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_MANIFEST = 'manifest.json'
+# Derivative filename; the source extension keeps photo.jpg and photo.png
+# apart, and it is unambiguous read from the right
+DERIVATIVE_FILENAME = '{stem}-{ext}-{width}.{fmt}'
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+# Longest side in pixels of the inline low-quality image placeholder (LQIP)
+PLACEHOLDER_SIZE = 16
+
+def convert_file(source_path, quality=80, replace=False):
+    """
+    Convert an image to WebP format, raising on failure
+    
+    Args:
+        source_path (str): Path to the source image
+        quality (int): WebP quality (0-100)
+        replace (bool): Whether to replace the original file
+        
+    Returns:
+        str: Path to the converted image
+    """
+    image_path = Path(source_path)
+    
+    # Open the image
+    with Image.open(image_path) as img:
+        # Create output path
+        if replace:
+            webp_path = image_path.with_suffix('.webp')
+        else:
+            webp_path = image_path.with_name(f"{image_path.stem}.webp")
+        
+        # Save as WebP
+        img.save(str(webp_path), 'WEBP', quality=quality)
+    
+    # If replacing, remove the original
+    if replace and webp_path.exists():
+        image_path.unlink()
+    
+    return str(webp_path)
+
+
 def convert_to_webp(source_path, quality=80, replace=False):
     """
     Convert an image to WebP format
@@ -37,29 +93,16 @@ def convert_to_webp(source_path, quality=80, replace=False):
         return None
     
     try:
-        # Open the image
-        with Image.open(image_path) as img:
-            # Create output path
-            if replace:
-                webp_path = image_path.with_suffix('.webp')
-            else:
-                webp_path = image_path.with_name(f"{image_path.stem}.webp")
-            
-            # Save as WebP
-            img.save(str(webp_path), 'WEBP', quality=quality)
-            print(f"Converted: {image_path} -> {webp_path}")
-            
-            # If replacing, remove the original
-            if replace and webp_path.exists():
-                image_path.unlink()
-                print(f"Removed original: {image_path}")
-            
-            return str(webp_path)
+        webp_path = convert_file(image_path, quality, replace)
+        print(f"Converted: {image_path} -> {webp_path}")
+        if replace:
+            print(f"Removed original: {image_path}")
+        return webp_path
     except Exception as e:
         print(f"Error converting {image_path}: {e}")
         return None
 
-def process_directory(directory, quality=80, replace=False, recursive=True):
+def process_directory(directory, quality=80, replace=False, recursive=True, jobs=1, cache=None):
     """
     Process all images in a directory
     
@@ -68,13 +111,18 @@ def process_directory(directory, quality=80, replace=False, recursive=True):
         quality (int): WebP quality (0-100)
         replace (bool): Whether to replace original files
         recursive (bool): Whether to process subdirectories
+        jobs (int): Number of worker processes (0 uses every CPU core)
+        cache (BuildCache): Skip images whose WebP copy is up to date
+        
+    Returns:
+        list: BatchResult objects for the converted images
     """
     extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
     directory_path = Path(directory)
     
     if not directory_path.exists():
         print(f"Error: Directory {directory} does not exist")
-        return
+        return []
     
     # Get all files in directory
     if recursive:
@@ -82,22 +130,252 @@ def process_directory(directory, quality=80, replace=False, recursive=True):
     else:
         all_files = list(directory_path.glob('*.*'))
     
-    # Filter image files
-    image_files = [f for f in all_files if f.suffix.lower() in extensions]
+    # Filter image files, sorted so runs are reproducible
+    image_files = sorted(f for f in all_files if f.suffix.lower() in extensions)
     
     if not image_files:
         print(f"No images found in {directory}")
-        return
+        return []
+    
+    params = {'quality': quality}
+    if cache is not None and not replace:
+        pending = [f for f in image_files if not cache.is_fresh('webp', f, params, [f.with_suffix('.webp')])]
+        if len(pending) < len(image_files):
+            print(f"Skipping {len(image_files) - len(pending)} unchanged images")
+        image_files = pending
+        if not image_files:
+            print("All images are up to date.")
+            cache.save()
+            return []
     
-    print(f"Found {len(image_files)} images to convert")
+    jobs = min(resolve_jobs(jobs), len(image_files))
+    print(f"Found {len(image_files)} images to convert using {jobs} worker(s)")
     
     # Convert all images
-    converted_count = 0
-    for image_file in image_files:
-        if convert_to_webp(image_file, quality, replace):
-            converted_count += 1
+    start = time.perf_counter()
+    results = run_batch(convert_file, image_files, (quality, replace), jobs, print_progress)
+    elapsed = time.perf_counter() - start
     
+    if cache is not None and not replace:
+        for result in results:
+            if result.ok:
+                cache.record('webp', result.item, params, [result.value])
+        cache.save()
+    
+    converted_count = sum(1 for result in results if result.ok)
     print(f"Conversion complete. Converted {converted_count} images.")
+    print_batch_report(results, elapsed, jobs, 'images')
+    return results
+
+
+def avif_supported():
+    """Return True if Pillow can encode AVIF images (e.g. via pillow-avif-plugin)."""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return 'AVIF' in Image.SAVE or bool(features.check('avif'))
+
+
+def make_placeholder(img, size=PLACEHOLDER_SIZE, quality=40):
+    """
+    Encode a tiny, blurred-when-upscaled copy of an image as a data URI
+    
+    At 16px the WebP is usually 100-200 bytes, small enough to inline in
+    API responses and paint before the real image arrives.
+    
+    Args:
+        img (PIL.Image.Image): Source image
+        size (int): Longest side of the placeholder in pixels
+        quality (int): WebP quality (0-100)
+        
+    Returns:
+        str: ``data:image/webp;base64,...`` URI
+    """
+    tiny = img.convert('RGB')
+    tiny.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=quality)
+    return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def describe_image(image_path):
+    """Return the intrinsic ``width``/``height`` and ``placeholder`` of an image file."""
+    with Image.open(image_path) as img:
+        return {
+            'width': img.width,
+            'height': img.height,
+            'placeholder': make_placeholder(img),
+        }
+
+
+def generate_derivatives(source_path, output_dir, widths=DERIVATIVE_WIDTHS, quality=80, formats=('webp',)):
+    """
+    Generate resized copies of an image for responsive srcset attributes
+    
+    Only widths smaller than the source are generated; if the source is
+    not wider than the largest requested width, a copy at its own width is
+    added as the largest candidate.
+    
+    Args:
+        source_path (str): Path to the source image
+        output_dir (str): Directory to save the derivatives
+        widths (tuple): Target widths in pixels
+        quality (int): Encoder quality (0-100)
+        formats (tuple): Output formats ('webp', 'avif')
+        
+    Returns:
+        dict: Manifest entry with the source dimensions, an inline
+        placeholder and the variants, or None on failure
+    """
+    image_path = Path(source_path)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        with Image.open(image_path) as img:
+            img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            source_width, source_height = img.size
+            
+            targets = sorted({w for w in widths if w < source_width})
+            if not widths or source_width <= max(widths):
+                # Keep a full-width candidate when the source is smaller
+                # than the largest requested width
+                targets.append(source_width)
+            
+            variants = []
+            for width in targets:
+                height = max(1, round(source_height * width / source_width))
+                resized = img if width == source_width else img.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    filename = DERIVATIVE_FILENAME.format(
+                        stem=image_path.stem, ext=image_path.suffix[1:], width=width, fmt=fmt)
+                    resized.save(str(output_path / filename), fmt.upper(), quality=quality)
+                    variants.append({
+                        'file': filename,
+                        'format': fmt,
+                        'width': width,
+                        'height': height,
+                    })
+            
+            print(f"Generated {len(variants)} derivatives for {image_path}")
+            return {
+                'width': source_width,
+                'height': source_height,
+                'placeholder': make_placeholder(img),
+                'variants': variants,
+            }
+    except Exception as e:
+        print(f"Error generating derivatives for {image_path}: {e}")
+        return None
+
+
+def build_derivatives(directory, output_dir, widths=DERIVATIVE_WIDTHS, quality=80, formats=('webp',), cache=None):
+    """
+    Generate derivatives for all images in a directory and write a manifest
+    
+    The manifest (``manifest.json`` in the output directory) maps each
+    source filename to its dimensions and generated variants, which are
+    named ``<stem>-<extension>-<width>.<format>``. Variants listed in the
+    previous manifest that are no longer listed (e.g. of removed sources)
+    are deleted.
+    
+    Args:
+        directory (str): Directory containing the source images
+        output_dir (str): Directory to save derivatives and the manifest
+        widths (tuple): Target widths in pixels
+        quality (int): Encoder quality (0-100)
+        formats (tuple): Output formats ('webp', 'avif')
+        cache (BuildCache): Reuse the derivatives of unchanged sources
+        
+    Returns:
+        dict: The manifest that was written, or None on failure
+    """
+    directory_path = Path(directory)
+    if not directory_path.exists():
+        print(f"Error: Directory {directory} does not exist")
+        return None
+    
+    if 'avif' in formats and not avif_supported():
+        print("AVIF encoding is not available, generating WebP only")
+        formats = tuple(fmt for fmt in formats if fmt != 'avif') or ('webp',)
+    
+    image_files = sorted(f for f in directory_path.glob('*.*') if f.suffix.lower() in SOURCE_EXTENSIONS)
+    if not image_files:
+        print(f"No images found in {directory}")
+        return None
+    
+    print(f"Generating {', '.join(formats)} derivatives at widths {', '.join(map(str, widths))} for {len(image_files)} images")
+    
+    params = {'widths': list(widths), 'quality': quality, 'formats': list(formats), 'placeholder': PLACEHOLDER_SIZE,
+              'filename': DERIVATIVE_FILENAME}
+    
+    images = {}
+    reused = 0
+    for image_file in image_files:
+        if cache is not None:
+            entry = cache.get_data('derivatives', image_file)
+            outputs = [Path(output_dir) / variant['file'] for variant in (entry or {}).get('variants', [])]
+            if entry and cache.is_fresh('derivatives', image_file, params, outputs):
+                images[image_file.name] = entry
+                reused += 1
+                continue
+        
+        entry = generate_derivatives(image_file, output_dir, widths, quality, formats)
+        if entry:
+            images[image_file.name] = entry
+            if cache is not None:
+                outputs = [Path(output_dir) / variant['file'] for variant in entry['variants']]
+                cache.record('derivatives', image_file, params, outputs, data=entry)
+    
+    if reused:
+        print(f"Reused derivatives of {reused} unchanged images")
+    if cache is not None:
+        cache.save()
+    
+    manifest = {
+        'widths': list(widths),
+        'formats': list(formats),
+        'images': images,
+    }
+    previous = variant_files(Path(output_dir) / DERIVATIVE_MANIFEST)
+    write_manifest(Path(output_dir) / DERIVATIVE_MANIFEST, manifest)
+    
+    # Only files the previous manifest listed are removed, never anything
+    # else in the output directory
+    stale = previous - {variant['file'] for entry in images.values() for variant in entry['variants']}
+    for filename in sorted(stale):
+        try:
+            os.remove(Path(output_dir) / filename)
+        except FileNotFoundError:
+            pass
+    if stale:
+        print(f"Removed {len(stale)} derivatives of removed or renamed images")
+    print(f"Derivatives complete. Wrote manifest for {len(images)} images to {output_dir}")
+    return manifest
+
+
+def variant_files(manifest_path):
+    """Return the variant filenames listed in a derivative manifest, or an empty set."""
+    try:
+        with open(manifest_path) as f:
+            images = json.load(f)['images']
+        files = {variant['file'] for entry in images.values() for variant in entry['variants']}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return set()
+    # Variants are written next to the manifest, so anything else is not one
+    return {filename for filename in files if isinstance(filename, str) and os.path.basename(filename) == filename}
+
+
+def write_manifest(path, manifest):
+    """Write a JSON manifest atomically, so readers never see a partial file."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Convert images to WebP format")
@@ -105,14 +383,18 @@ def main():
     parser.add_argument('--quality', type=int, default=80, help="WebP quality (0-100)")
     parser.add_argument('--replace', action='store_true', help="Replace original files")
     parser.add_argument('--no-recursive', action='store_true', help="Don't process subdirectories")
+    parser.add_argument('--jobs', type=int, default=1, help="Number of parallel worker processes (0 = all cores)")
+    parser.add_argument('--cache', help="Build manifest used to skip unchanged images")
+    parser.add_argument('--force', action='store_true', help="Convert all images, ignoring the build manifest")
     
     args = parser.parse_args()
+    cache = BuildCache(args.cache, force=args.force) if args.cache else None
     
     path = Path(args.path)
     if path.is_file():
         convert_to_webp(path, args.quality, args.replace)
     elif path.is_dir():
-        process_directory(path, args.quality, args.replace, not args.no_recursive)
+        process_directory(path, args.quality, args.replace, not args.no_recursive, args.jobs, cache)
     else:
         print(f"Error: {path} is not a valid file or directory")
         return 1
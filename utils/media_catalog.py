@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+"""
+Media Catalog
+
+This module keeps an in-memory index of the gallery images and videos.
+The asset directories are scanned once and every gallery request is served
+from the pre-sorted entries without touching the filesystem.
+
+New, removed or renamed files are picked up by an incremental refresh that
+checks the directory modification times at most once per refresh interval.
+
+The build tools save the catalog to a memory-mapped snapshot, so workers
+spawned on demand start from it instead of scanning the directories.
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import struct
+import threading
+import time
+from collections import namedtuple
+
+try:
+    from utils.build_cache import find_static_folder, instance_path
+    from utils.catalog_snapshot import Snapshot, write_snapshot
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from build_cache import find_static_folder, instance_path
+    from catalog_snapshot import Snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.webp'}
+VIDEO_EXTENSIONS = {'.mp4'}
+PLACEHOLDER_THUMBNAIL = 'video-placeholder.webp'
+DERIVATIVE_MANIFEST = 'manifest.json'
+RENDITION_MANIFEST = 'manifest.json'
+THUMBNAIL_MANIFEST = 'manifest.json'
+# Videos are served by the range-aware media route, not the static route
+VIDEO_URL_PREFIX = '/media/videos'
+# Longest cursor accepted, checked before decoding
+MAX_CURSOR_LENGTH = 1024
+# Catalog snapshot, next to the build cache in the instance folder
+SNAPSHOT_FILE = 'media-catalog.snapshot'
+
+# A single file of the catalog, as found during the directory scan
+MediaEntry = namedtuple('MediaEntry', ['filename', 'size', 'mtime'])
+
+
+def schema_digest():
+    """
+    Return a digest of the code that lays out the catalog items
+
+    A snapshot records it, so a snapshot written by other code (e.g. before
+    a deploy changed the item fields) is discarded instead of served.
+    """
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+SNAPSHOT_SCHEMA = schema_digest()
+
+
+def list_directory(directory, extensions):
+    """
+    List the media files of a directory without stat-ing them
+
+    Args:
+        directory (str): Directory to list
+        extensions (set): Lowercase file extensions to keep
+
+    Returns:
+        dict: os.DirEntry objects by filename, or None if the directory
+        does not exist
+    """
+    if not os.path.isdir(directory):
+        return None
+
+    with os.scandir(directory) as it:
+        return {
+            item.name: item
+            for item in it
+            if os.path.splitext(item.name)[1].lower() in extensions and item.is_file()
+        }
+
+
+def make_entry(item):
+    """Create a MediaEntry from an os.DirEntry."""
+    stat = item.stat()
+    return MediaEntry(item.name, stat.st_size, stat.st_mtime)
+
+
+def scan_directory(directory, extensions):
+    """
+    Scan a directory for media files
+
+    Args:
+        directory (str): Directory to scan
+        extensions (set): Lowercase file extensions to keep
+
+    Returns:
+        list: MediaEntry objects sorted by filename, or None if the
+        directory does not exist
+    """
+    items = list_directory(directory, extensions)
+    if items is None:
+        return None
+
+    return sorted((make_entry(item) for item in items.values()), key=lambda entry: entry.filename)
+
+
+def update_entries(entries, directory, extensions):
+    """
+    Apply the files added to or removed from a directory to its entries
+
+    Only the new files are stat-ed; unchanged entries are kept as they are.
+    A rename shows up as one removed and one added file.
+
+    Args:
+        entries (list): Current sorted MediaEntry objects, or None
+        directory (str): Directory the entries were scanned from
+        extensions (set): Lowercase file extensions to keep
+
+    Returns:
+        tuple: (entries, changed)
+    """
+    items = list_directory(directory, extensions)
+    if items is None or entries is None:
+        changed = (items is None) != (entries is None)
+        return (None if items is None else scan_directory(directory, extensions)), changed
+
+    known = {entry.filename for entry in entries}
+    added = items.keys() - known
+    removed = known - items.keys()
+    if not added and not removed:
+        return entries, False
+
+    entries = [entry for entry in entries if entry.filename not in removed]
+    entries.extend(make_entry(items[name]) for name in added)
+    entries.sort(key=lambda entry: entry.filename)
+    return entries, True
+
+
+def directory_mtime(directory):
+    """Return the modification time of a directory, or None if it is missing."""
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def static_url(relpath, bundle=None):
+    """
+    Return the URL of a static file
+
+    Args:
+        relpath (str): Path relative to the static folder
+        bundle (AssetBundle): Fingerprinted files; a bundled file gets its
+            immutable ``/dist`` URL, any other its plain ``/static`` URL
+    """
+    return (bundle.url(relpath) if bundle else None) or f"/static/{relpath}"
+
+
+def load_derivatives(static_folder, source, bundle=None):
+    """
+    Load the responsive derivative manifest written by the image converter
+
+    Args:
+        static_folder (str): Flask static folder
+        source (str): Source directory name under static/assets (e.g. 'images')
+        bundle (AssetBundle): Fingerprinted files the srcsets point at
+
+    Returns:
+        dict: Per source filename, the intrinsic ``width``/``height``, an
+        inline ``placeholder`` data URI, a WebP ``srcset`` string and the
+        ``sources`` for a <picture> element
+    """
+    manifest_path = os.path.join(static_folder, 'assets', 'derivatives', source, DERIVATIVE_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict):
+        logger.warning(f"Ignoring malformed derivative manifest {manifest_path}")
+        return {}
+
+    derivatives = {}
+    for filename, entry in manifest.get('images', {}).items():
+        try:
+            srcsets = {}
+            for variant in entry['variants']:
+                url = static_url(f"assets/derivatives/{source}/{variant['file']}", bundle)
+                srcsets.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+            # Most efficient format first, as <picture> picks the first match
+            sources = [
+                {'type': f"image/{fmt}", 'srcset': ', '.join(srcsets[fmt])}
+                for fmt in ('avif', 'webp')
+                if fmt in srcsets
+            ]
+            derivatives[filename] = {
+                'width': entry['width'],
+                'height': entry['height'],
+                'placeholder': entry.get('placeholder'),
+                'srcset': ', '.join(srcsets.get('webp', [])),
+                'sources': sources,
+            }
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Skipping malformed derivative entry {filename} in {manifest_path}: {e!r}")
+    return derivatives
+
+
+def load_thumbnail_info(thumbnail_dir):
+    """
+    Load the thumbnail dimensions and placeholders written by the thumbnailer
+
+    Args:
+        thumbnail_dir (str): Directory containing the thumbnails
+
+    Returns:
+        dict: Per thumbnail filename, its ``width``, ``height`` and inline
+        ``placeholder`` data URI
+    """
+    try:
+        with open(os.path.join(thumbnail_dir, THUMBNAIL_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    info = {}
+    for filename, entry in (manifest.get('thumbnails', {}) if isinstance(manifest, dict) else {}).items():
+        try:
+            info[filename] = {
+                'width': entry['width'],
+                'height': entry['height'],
+                'placeholder': entry['placeholder'],
+            }
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Skipping malformed thumbnail entry {filename}: {e!r}")
+    return info
+
+
+def load_sprites(sprite_dir, bundle=None):
+    """
+    Load the preview sprite sheet indexes written by the video thumbnailer
+
+    Args:
+        sprite_dir (str): Directory containing ``<stem>_sprite.json`` files
+        bundle (AssetBundle): Fingerprinted files the sprite URLs point at
+
+    Returns:
+        dict: Per video filename, the ``preview`` object of the API items
+    """
+    sprites = {}
+    if not os.path.isdir(sprite_dir):
+        return sprites
+
+    relpath = 'assets/thumbnails/sprites'
+    with os.scandir(sprite_dir) as it:
+        for item in it:
+            if not item.name.endswith('_sprite.json'):
+                continue
+            try:
+                with open(item.path) as f:
+                    index = json.load(f)
+                sprites[index['video']] = {
+                    'sprite': static_url(f"{relpath}/{index['sprite']}", bundle),
+                    # The track names the sprite by its plain filename, which
+                    # only resolves next to it under /static
+                    'vtt': static_url(f"{relpath}/{index['vtt']}"),
+                    'tile_width': index['tile_width'],
+                    'tile_height': index['tile_height'],
+                    'columns': index['columns'],
+                    'rows': index['rows'],
+                    'frames': [frame['time'] for frame in index['frames']],
+                }
+            except (OSError, ValueError):
+                continue
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Skipping malformed sprite index {item.path}: {e!r}")
+    return sprites
+
+
+def load_renditions(rendition_dir):
+    """
+    Load the streaming rendition manifest written by the video transcoder
+
+    Args:
+        rendition_dir (str): Directory containing the renditions
+
+    Returns:
+        dict: Per video filename, the ``renditions`` list of the API items,
+        smallest first
+    """
+    try:
+        with open(os.path.join(rendition_dir, RENDITION_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    renditions = {}
+    for filename, entries in (manifest.get('videos', {}) if isinstance(manifest, dict) else {}).items():
+        if not entries:
+            continue
+        try:
+            renditions[filename] = [
+                {
+                    'name': entry['name'],
+                    'url': f"{VIDEO_URL_PREFIX}/renditions/{entry['file']}",
+                    'width': entry['width'],
+                    'height': entry['height'],
+                    'bitrate': entry['bitrate'],
+                    'size': entry['size'],
+                }
+                for entry in sorted(entries, key=lambda entry: entry['height'])
+            ]
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Skipping malformed renditions of {filename}: {e!r}")
+    return renditions
+
+
+def encode_cursor(filename):
+    """Return the opaque cursor pointing after a file."""
+    return base64.urlsafe_b64encode(filename.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Return the filename a cursor points after
+
+    Raises:
+        ValueError: If the cursor is not one returned by encode_cursor
+    """
+    if len(cursor) > MAX_CURSOR_LENGTH:
+        raise ValueError('cursor too long')
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return base64.b64decode(padded, altchars=b'-_', validate=True).decode('utf-8')
+
+
+def keyset_page(items, keys, cursor, limit):
+    """
+    Slice the items that follow a cursor out of a pre-sorted list
+
+    Unlike page numbers, a cursor names the last file a client has seen,
+    so files added or removed in the meantime do not shift the next page.
+
+    Args:
+        items (list): Items to paginate
+        keys (list): Sorted filenames of the items
+        cursor (str): Cursor from a previous page, or None for the first
+        limit (int): Number of items per page
+
+    Returns:
+        tuple: (page_items, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    start = 0 if not cursor else bisect.bisect_right(keys, decode_cursor(cursor))
+    end = start + limit
+    next_cursor = encode_cursor(keys[end - 1]) if end < len(keys) else None
+    return items[start:end], next_cursor
+
+
+def save_catalog_snapshot(asset_dir):
+    """
+    Scan the media directories and write the snapshot new workers start from
+
+    Called by the build tools after they changed the assets.
+
+    Args:
+        asset_dir (str): Asset directory the tool worked on, e.g.
+            ``static/assets/images``; the snapshot covers its static folder
+    """
+    static_folder = find_static_folder(asset_dir)
+    if static_folder is None:
+        print(f"Not writing the media catalog snapshot: {asset_dir} is not inside a static/assets directory")
+        return
+    # Imported here, as the bundler imports this module to refresh the snapshot
+    try:
+        from utils.asset_bundle import AssetBundle
+    except ImportError:
+        from asset_bundle import AssetBundle
+
+    path = instance_path(static_folder, SNAPSHOT_FILE)
+    catalog = MediaCatalog(static_folder, bundle=AssetBundle(static_folder))
+    if catalog.save_snapshot(path):
+        print(f"Wrote media catalog snapshot for {len(catalog.image_items)} images and "
+              f"{len(catalog.video_items)} videos to {path}")
+
+
+def paginate(items, page, per_page):
+    """
+    Slice a page out of a pre-sorted list
+
+    Args:
+        items (list): Items to paginate
+        page (int): Requested 1-based page, clamped to the valid range
+        per_page (int): Number of items per page
+
+    Returns:
+        tuple: (page_items, page, total_pages)
+    """
+    total = len(items)
+    total_pages = math.ceil(total / per_page)
+
+    # Adjust page if out of range
+    if page < 1:
+        page = 1
+    elif page > total_pages and total_pages > 0:
+        page = total_pages
+
+    start_idx = (page - 1) * per_page
+    return items[start_idx:start_idx + per_page], page, total_pages
+
+
+class CatalogIndex(namedtuple('CatalogIndex', [
+        'images', 'videos', 'image_items', 'video_items', 'image_keys', 'video_keys', 'version'])):
+    """
+    Everything a gallery request reads from the catalog
+
+    A refresh publishes a new index in one assignment. A request reads
+    ``MediaCatalog.index`` once and takes its items, totals and version
+    from that object, so it never pairs the keys of one build with the
+    items of another, or caches a body under the wrong version.
+    """
+
+    __slots__ = ()
+
+    @property
+    def has_images(self):
+        return self.images is not None
+
+    @property
+    def has_videos(self):
+        return self.videos is not None
+
+    def image_page(self, page, per_page):
+        """Return (items, page, total_pages) for a page of images."""
+        return paginate(self.image_items, page, per_page)
+
+    def video_page(self, page, per_page):
+        """Return (items, page, total_pages) for a page of videos."""
+        return paginate(self.video_items, page, per_page)
+
+    def images_after(self, cursor, limit):
+        """Return (items, next cursor) for the images following a cursor."""
+        return keyset_page(self.image_items, self.image_keys, cursor, limit)
+
+    def videos_after(self, cursor, limit):
+        """Return (items, next cursor) for the videos following a cursor."""
+        return keyset_page(self.video_items, self.video_keys, cursor, limit)
+
+    def sample(self, count, seed=None):
+        """
+        Draw a random mix of images and videos
+
+        Indices are drawn over the combined listing without building or
+        shuffling it, so the cost grows with ``count``, not the library.
+
+        Args:
+            count (int): Number of items to draw
+            seed (int): Seed for a reproducible draw, shared by all workers
+
+        Returns:
+            list: Response items tagged with their ``type``
+        """
+        images, videos = self.image_items, self.video_items
+        total = len(images) + len(videos)
+        rng = random.Random(seed) if seed is not None else random
+
+        items = []
+        for idx in rng.sample(range(total), max(0, min(count, total))):
+            if idx < len(images):
+                items.append(dict(images[idx], type='image'))
+            else:
+                items.append(dict(videos[idx - len(images)], type='video'))
+        return items
+
+
+class MediaCatalog:
+    """
+    In-memory listing of the gallery images, videos and thumbnails
+
+    The response items for every entry are built when the catalog is
+    (re)indexed, so a page request is a plain list slice.
+
+    Each worker process keeps its own catalog and checks the asset
+    directories for changes at most once every ``refresh_interval`` seconds,
+    so files dropped into ``static/assets`` reach every worker without a
+    restart. Touching a directory forces the next check to rescan it.
+
+    With a ``snapshot_path``, the catalog starts from the snapshot when the
+    directory modification times it recorded still match, and serves the
+    items from the shared mapping until the first change. Otherwise it
+    scans the directories and saves a fresh snapshot for the next worker.
+
+    With a ``bundle``, item URLs point at the fingerprinted copies of the
+    files built by build_assets.py, which are cached for a year.
+    """
+
+    def __init__(self, static_folder, refresh_interval=5.0, snapshot_path=None, bundle=None):
+        self.static_folder = static_folder
+        self.bundle = bundle
+        self.refresh_interval = refresh_interval
+        self.image_dir = os.path.join(static_folder, 'assets', 'images')
+        self.video_dir = os.path.join(static_folder, 'assets', 'videos')
+        self.thumbnail_dir = os.path.join(static_folder, 'assets', 'thumbnails')
+        self.derivative_dir = os.path.join(static_folder, 'assets', 'derivatives', 'images')
+        self.sprite_dir = os.path.join(self.thumbnail_dir, 'sprites')
+        self.rendition_dir = os.path.join(self.video_dir, 'renditions')
+
+        self.index = CatalogIndex(None, None, [], [], [], [], None)
+        self.thumbnails = set()
+        self.thumbnail_info = {}
+        self.derivatives = {}
+        self.sprites = {}
+        self.renditions = {}
+
+        self._dir_mtimes = {}
+        self._last_check = 0.0
+        self._refresh_lock = threading.Lock()
+
+        if snapshot_path and self.load_snapshot(snapshot_path):
+            return
+        self.rebuild()
+        if snapshot_path:
+            self.save_snapshot(snapshot_path)
+
+    @property
+    def images(self):
+        return self.index.images
+
+    @property
+    def videos(self):
+        return self.index.videos
+
+    @property
+    def image_items(self):
+        return self.index.image_items
+
+    @property
+    def video_items(self):
+        return self.index.video_items
+
+    @property
+    def image_keys(self):
+        """Sorted filenames of the image items, for cursor pagination."""
+        return self.index.image_keys
+
+    @property
+    def video_keys(self):
+        """Sorted filenames of the video items, for cursor pagination."""
+        return self.index.video_keys
+
+    @property
+    def version(self):
+        return self.index.version
+
+    @property
+    def bundle_version(self):
+        """Version of the asset bundle the item URLs point at, or None."""
+        return self.bundle.version if self.bundle else None
+
+    @property
+    def directories(self):
+        return (self.image_dir, self.video_dir, self.thumbnail_dir, self.derivative_dir, self.sprite_dir,
+                self.rendition_dir)
+
+    def rebuild(self):
+        """Rescan all media directories and rebuild the index."""
+        self._dir_mtimes = {directory: directory_mtime(directory) for directory in self.directories}
+        self._last_check = time.monotonic()
+
+        images = scan_directory(self.image_dir, IMAGE_EXTENSIONS)
+        videos = scan_directory(self.video_dir, VIDEO_EXTENSIONS)
+        thumbnails = list_directory(self.thumbnail_dir, IMAGE_EXTENSIONS)
+        self.thumbnails = set(thumbnails or ())
+        self.thumbnail_info = load_thumbnail_info(self.thumbnail_dir)
+        self.derivatives = load_derivatives(self.static_folder, 'images', self.bundle)
+        self.sprites = load_sprites(self.sprite_dir, self.bundle)
+        self.renditions = load_renditions(self.rendition_dir)
+        self._index(images, videos)
+
+    def snapshot_state(self, index):
+        """Return the state a snapshot needs to restore the catalog."""
+        return {
+            'directories': {
+                os.path.relpath(directory, self.static_folder): mtime
+                for directory, mtime in self._dir_mtimes.items()
+            },
+            'images': index.images,
+            'videos': index.videos,
+            'thumbnails': sorted(self.thumbnails),
+            'thumbnail_info': self.thumbnail_info,
+            'derivatives': self.derivatives,
+            'sprites': self.sprites,
+            'renditions': self.renditions,
+            'version': index.version,
+            'schema': SNAPSHOT_SCHEMA,
+            'bundle': self.bundle_version,
+        }
+
+    def save_snapshot(self, path):
+        """
+        Write the catalog to a snapshot file
+
+        Returns:
+            bool: True if the snapshot was written
+        """
+        index = self.index
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_snapshot(path, self.snapshot_state(index), {
+                'images': list(index.image_items),
+                'videos': list(index.video_items),
+            })
+        except OSError as e:
+            logger.error(f"Error writing media catalog snapshot {path}: {e}")
+            return False
+        return True
+
+    def load_snapshot(self, path):
+        """
+        Restore the catalog from a snapshot file
+
+        The snapshot is only used if it was written by this version of the
+        catalog code and none of the media directories changed since.
+
+        Returns:
+            bool: True if the catalog was restored
+        """
+        try:
+            snapshot = Snapshot(path)
+            state = snapshot.state
+            if state.get('schema') != SNAPSHOT_SCHEMA or state.get('bundle') != self.bundle_version:
+                return False
+            recorded = {
+                os.path.join(self.static_folder, directory): mtime
+                for directory, mtime in state['directories'].items()
+            }
+            mtimes = {directory: directory_mtime(directory) for directory in self.directories}
+            if recorded != mtimes:
+                return False
+
+            images = None if state['images'] is None else [MediaEntry(*entry) for entry in state['images']]
+            videos = None if state['videos'] is None else [MediaEntry(*entry) for entry in state['videos']]
+            self.thumbnails = set(state['thumbnails'])
+            self.thumbnail_info = state['thumbnail_info']
+            self.derivatives = state['derivatives']
+            self.sprites = state['sprites']
+            self.renditions = state['renditions']
+            self.index = CatalogIndex(
+                images,
+                videos,
+                snapshot.section('images'),
+                snapshot.section('videos'),
+                [entry.filename for entry in images or []],
+                [entry.filename for entry in videos or []],
+                state['version'],
+            )
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            logger.warning(f"Ignoring media catalog snapshot {path}: {e}")
+            return False
+
+        self._dir_mtimes = mtimes
+        self._last_check = time.monotonic()
+        return True
+
+    def refresh_if_stale(self):
+        """
+        Apply added, removed or renamed files to the index
+
+        The directory modification times are checked at most once per
+        refresh interval; only directories whose mtime changed are listed
+        again.
+
+        Returns:
+            bool: True if the catalog changed
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return False
+
+        # Only one thread per worker performs the check
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._last_check = now
+            mtimes = {directory: directory_mtime(directory) for directory in self.directories}
+            if mtimes == self._dir_mtimes:
+                return False
+            stale = {directory for directory in mtimes if mtimes[directory] != self._dir_mtimes.get(directory)}
+            self._dir_mtimes = mtimes
+
+            changed = False
+            images, videos = self.index.images, self.index.videos
+            if self.image_dir in stale:
+                images, updated = update_entries(images, self.image_dir, IMAGE_EXTENSIONS)
+                changed |= updated
+            if self.video_dir in stale:
+                videos, updated = update_entries(videos, self.video_dir, VIDEO_EXTENSIONS)
+                changed |= updated
+            if self.thumbnail_dir in stale:
+                thumbnails = set(list_directory(self.thumbnail_dir, IMAGE_EXTENSIONS) or ())
+                thumbnail_info = load_thumbnail_info(self.thumbnail_dir)
+                changed |= thumbnails != self.thumbnails or thumbnail_info != self.thumbnail_info
+                self.thumbnails = thumbnails
+                self.thumbnail_info = thumbnail_info
+            if self.derivative_dir in stale:
+                # The manifest is replaced atomically, which bumps the mtime
+                derivatives = load_derivatives(self.static_folder, 'images', self.bundle)
+                changed |= derivatives != self.derivatives
+                self.derivatives = derivatives
+            if self.sprite_dir in stale:
+                sprites = load_sprites(self.sprite_dir, self.bundle)
+                changed |= sprites != self.sprites
+                self.sprites = sprites
+            if self.rendition_dir in stale:
+                renditions = load_renditions(self.rendition_dir)
+                changed |= renditions != self.renditions
+                self.renditions = renditions
+
+            if changed:
+                self._index(images, videos)
+            return changed
+        finally:
+            self._refresh_lock.release()
+
+    def thumbnail_filename(self, video_filename):
+        """Return the thumbnail filename for a video, falling back to the placeholder."""
+        thumbnail_filename = f"{os.path.splitext(video_filename)[0]}.webp"
+        if thumbnail_filename not in self.thumbnails:
+            thumbnail_filename = PLACEHOLDER_THUMBNAIL
+        return thumbnail_filename
+
+    def _index(self, images, videos):
+        """Build the response items and the catalog version and publish them."""
+        image_items = [
+            dict(
+                {
+                    'id': i,  # Using 1-based index
+                    'filename': entry.filename,
+                    'path': static_url(f"assets/images/{entry.filename}", self.bundle),
+                    'title': f"Armada Mobil CV. Enam Satu Rentalindo #{i}",
+                },
+                **self.derivatives.get(entry.filename, {}),
+            )
+            for i, entry in enumerate(images or [], start=1)
+        ]
+        video_items = []
+        for i, entry in enumerate(videos or [], start=1):
+            thumbnail_filename = self.thumbnail_filename(entry.filename)
+            item = {
+                'id': i,  # Using 1-based index
+                'filename': entry.filename,
+                'path': f"{VIDEO_URL_PREFIX}/{entry.filename}",
+                'thumbnail': static_url(f"assets/thumbnails/{thumbnail_filename}", self.bundle),
+                'title': f"Video Armada #{i}",
+            }
+            # Dimensions and placeholder describe the thumbnail, not the video
+            item.update(self.thumbnail_info.get(thumbnail_filename, {}))
+            if entry.filename in self.sprites:
+                item['preview'] = self.sprites[entry.filename]
+            if entry.filename in self.renditions:
+                item['renditions'] = self.renditions[entry.filename]
+            video_items.append(item)
+
+        # The version only depends on the directory contents, so every
+        # worker that sees the same files agrees on it
+        digest = hashlib.sha1()
+        for kind, entries in (('i', images), ('v', videos)):
+            for entry in entries or []:
+                digest.update(f"{kind}:{entry.filename}:{entry.size}:{entry.mtime}\n".encode())
+        for filename in sorted(self.thumbnails):
+            digest.update(f"t:{filename}\n".encode())
+        digest.update(json.dumps(self.thumbnail_info, sort_keys=True).encode())
+        digest.update(json.dumps(self.derivatives, sort_keys=True).encode())
+        digest.update(json.dumps(self.sprites, sort_keys=True).encode())
+        digest.update(json.dumps(self.renditions, sort_keys=True).encode())
+        digest.update(f"b:{self.bundle_version}\n".encode())
+
+        self.index = CatalogIndex(
+            images,
+            videos,
+            image_items,
+            video_items,
+            [entry.filename for entry in images or []],
+            [entry.filename for entry in videos or []],
+            digest.hexdigest()[:16],
+        )
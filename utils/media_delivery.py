@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Media Delivery
+
+This module serves large media files (videos) with HTTP range support
+without reading them through Python. Byte ranges are handed to the WSGI
+server as a seeked file object, so servers with sendfile support (e.g.
+Gunicorn) copy the range straight from the page cache to the socket. When
+a front-end web server is configured, the file is delegated to it with an
+``X-Accel-Redirect`` header instead.
+
+The same path serves the precompressed, fingerprinted static bundle.
+"""
+
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import Response, request, abort
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+
+class FileRange:
+    """
+    Read-only view of a byte range of an open file
+
+    ``fileno()`` exposes the underlying descriptor, positioned at the start
+    of the range, so a server can ``sendfile`` exactly Content-Length bytes.
+    Servers without sendfile iterate over ``read()``, which stops at the end
+    of the range.
+    """
+
+    def __init__(self, file, start, length):
+        self._file = file
+        self._file.seek(start)
+        self._remaining = length
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def send_media(directory, filename, mimetype='video/mp4', max_age=86400, accel_prefix=None,
+               content_encoding=None, immutable=False):
+    """
+    Send a media file with ETag, conditional GET and single-range support
+
+    Args:
+        directory (str): Directory containing the media files
+        filename (str): File path relative to the directory
+        mimetype (str): Content type of the file
+        max_age (int): Cache lifetime in seconds
+        accel_prefix (str): Internal location of the directory on the
+            front-end server (e.g. '/protected/videos'); when set, the file
+            is served by that server via X-Accel-Redirect
+        content_encoding (str): Encoding of a precompressed file (e.g. 'br')
+        immutable (bool): Mark the response as never changing, for
+            fingerprinted URLs
+
+    Returns:
+        flask.Response: The (partial) file response
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    if accel_prefix:
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(filename)}"
+        return response
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f"{stat.st_mtime_ns:x}-{size:x}"
+    # Last-Modified has whole-second precision
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f"public, max-age={max_age}{', immutable' if immutable else ''}",
+    }
+    if content_encoding:
+        headers['Content-Encoding'] = content_encoding
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    byte_range = request.range
+    # A stale If-Range means the client's partial copy is outdated: send it
+    # all. The validator is either an ETag or a Last-Modified date.
+    if_range = request.if_range
+    if byte_range is not None:
+        if if_range.etag is not None:
+            if if_range.etag != etag:
+                byte_range = None
+        elif if_range.date is not None and if_range.date != last_modified:
+            byte_range = None
+
+    status = 200
+    start, length = 0, size
+    if byte_range is not None:
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            if len(byte_range.ranges) == 1:
+                headers['Content-Range'] = f"bytes */{size}"
+                response = Response(status=416, headers=headers)
+                response.set_etag(etag)
+                return response
+            # Multiple ranges are not supported; send the whole file
+        else:
+            start, stop = bounds
+            length = stop - start
+            status = 206
+            headers['Content-Range'] = byte_range.to_content_range_header(size)
+
+    file = open(path, 'rb')
+    body = wrap_file(request.environ, FileRange(file, start, length))
+    response = Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+    response.content_length = length
+    response.last_modified = last_modified
+    response.set_etag(etag)
+    return response
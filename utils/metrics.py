@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Request Metrics
+
+This module records per-endpoint request counts, latency and response size
+histograms, and the time requests spend in each phase (filesystem scans,
+rendering, serialization), and renders them in the Prometheus text format.
+
+Every worker process keeps its own metrics in memory and writes a snapshot
+to a shared directory at most once per flush interval. A scrape, whichever
+worker answers it, merges the snapshots of all live workers, so the totals
+are the same under multi-process Gunicorn. The snapshots of workers that
+have exited are added to an archive file before they are removed, so the
+totals never go down when a worker is recycled.
+
+The first request of every worker also records the time since the process
+started, which shows how long workers spawned on demand keep visitors
+waiting.
+"""
+
+import os
+import json
+import fcntl
+import logging
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COLD_START_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS_TOTAL = 'http_requests_total'
+REQUEST_LABELS = ('endpoint', 'method', 'status')
+REQUEST_HELP = 'Requests by endpoint, method and status code.'
+
+# Histogram name: (help, label names, bucket upper bounds)
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Time to produce a response, by endpoint.', ('endpoint',), DURATION_BUCKETS),
+    'http_response_size_bytes': (
+        'Response body size, by endpoint.', ('endpoint',), SIZE_BUCKETS),
+    'http_request_phase_seconds': (
+        'Time spent in a request phase (scan, render, serialize), by endpoint.', ('endpoint', 'phase'),
+        DURATION_BUCKETS),
+    'worker_first_response_seconds': (
+        'Time from the start of a worker process to its first response.', (), COLD_START_BUCKETS),
+}
+
+# Counts of exited workers, and the lock serializing updates to it
+ARCHIVE_FILE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+
+# Fallback start time when /proc is not available
+MODULE_LOADED = time.time()
+
+
+@contextmanager
+def timed(phases, name):
+    """Add the time spent in a block to ``phases[name]``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def process_alive(pid):
+    """Return True if a process with the given pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start_time():
+    """
+    Return the Unix time this process started
+
+    Read from /proc on Linux, so the interpreter start-up and imports are
+    included; elsewhere, the time this module was loaded.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name, which may contain spaces;
+            # the start time is field 22, in clock ticks since boot
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        # The boot time in /proc/stat is rounded to the second, so go
+        # through the age of the process instead
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return MODULE_LOADED
+
+
+def read_snapshot(path):
+    """Return a snapshot file's data, or None if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_snapshot(requests, histograms, snapshot):
+    """Add the counts of a snapshot to merged requests and histograms."""
+    for *key, count in snapshot['requests']:
+        requests[tuple(key)] = requests.get(tuple(key), 0) + count
+    for name, entries in snapshot['histograms'].items():
+        if name not in histograms:
+            continue
+        for *labels, series in entries:
+            merged = histograms[name].setdefault(tuple(labels), [0] * len(series))
+            for i, value in enumerate(series):
+                merged[i] += value
+
+
+def escape_label(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    """Format a label set, e.g. {endpoint="index",le="0.1"}."""
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    """Format a sample value, without a fractional part for whole numbers."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """
+    Thread-safe metrics of one worker process, with multi-process collection
+
+    Args:
+        directory (str): Directory shared by the workers for their
+            snapshots, or None to report this process only
+        flush_interval (float): Least number of seconds between snapshots
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.requests = {}
+        # name -> {label values: [bucket counts..., sum, count]}
+        self.histograms = {name: {} for name in HISTOGRAMS}
+
+        self.started = process_start_time()
+        self._first_response = True
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _observe(self, name, labels, value):
+        """Add an observation to a histogram; the lock must be held."""
+        buckets = HISTOGRAMS[name][2]
+        series = self.histograms[name].get(labels)
+        if series is None:
+            series = self.histograms[name][labels] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def observe_request(self, endpoint, method, status, duration, size=None, phases=None):
+        """
+        Record a finished request
+
+        Args:
+            endpoint (str): Flask endpoint name
+            method (str): HTTP method
+            status (int): Response status code
+            duration (float): Seconds spent producing the response
+            size (int): Response body size in bytes, if known
+            phases (dict): Seconds spent per phase (e.g. {'scan': 0.001})
+        """
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._observe('http_request_duration_seconds', (endpoint,), duration)
+            if size is not None:
+                self._observe('http_response_size_bytes', (endpoint,), size)
+            for phase, seconds in (phases or {}).items():
+                self._observe('http_request_phase_seconds', (endpoint, phase), seconds)
+            if self._first_response:
+                self._first_response = False
+                self._observe('worker_first_response_seconds', (), time.time() - self.started)
+
+    def snapshot(self):
+        """Return the metrics of this process as JSON-serializable data."""
+        with self._lock:
+            return {
+                'requests': [list(key) + [count] for key, count in self.requests.items()],
+                'histograms': {
+                    name: [list(labels) + [list(series)] for labels, series in entries.items()]
+                    for name, entries in self.histograms.items()
+                },
+            }
+
+    def snapshot_path(self, pid=None):
+        """Return the snapshot file of a worker (default: this process)."""
+        return os.path.join(self.directory, f"{pid or os.getpid()}.json")
+
+    def flush(self, force=False):
+        """Write this process's snapshot, at most once per flush interval unless forced."""
+        if not self.directory:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_flush < self.flush_interval:
+                return
+            self._last_flush = now
+
+        path = self.snapshot_path()
+        # One writer at a time, so an older snapshot cannot replace a newer one
+        with self._flush_lock:
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=f".{os.getpid()}.", suffix='.tmp', dir=self.directory)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self.snapshot(), f, separators=(',', ':'))
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Error writing metrics snapshot {path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def archive(self, paths):
+        """
+        Add the snapshots of exited workers to the archive and remove them
+
+        Workers may do this concurrently; the archive is only updated under
+        an exclusive file lock, and snapshots that another worker archived
+        in the meantime are skipped.
+
+        Args:
+            paths (list): Snapshot files of exited workers
+
+        Returns:
+            dict: The archive, or None if there is none
+        """
+        archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+        with open(os.path.join(self.directory, ARCHIVE_LOCK), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = read_snapshot(archive_path)
+            snapshots = [snapshot for snapshot in map(read_snapshot, paths) if snapshot is not None]
+            if not snapshots:
+                return archive
+
+            requests = {}
+            histograms = {name: {} for name in HISTOGRAMS}
+            for snapshot in ([archive] if archive else []) + snapshots:
+                merge_snapshot(requests, histograms, snapshot)
+            archive = {
+                'requests': [list(key) + [count] for key, count in requests.items()],
+                'histograms': {
+                    name: [list(labels) + [series] for labels, series in entries.items()]
+                    for name, entries in histograms.items()
+                },
+            }
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix='.archive.', suffix='.tmp', dir=self.directory)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(archive, f, separators=(',', ':'))
+                os.replace(tmp_path, archive_path)
+            except OSError as e:
+                # Keep the snapshots, so the next scrape archives them
+                logger.error(f"Error writing metrics archive {archive_path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return archive
+
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return archive
+
+    def collect(self):
+        """
+        Merge the snapshots of all live workers and the archive of exited ones
+
+        Returns:
+            tuple: (requests, histograms) in the layout of the attributes
+        """
+        snapshots = [self.snapshot()]
+        if self.directory:
+            # Whatever this scrape reports is on disk, should this worker exit
+            self.flush(force=True)
+            own = os.path.basename(self.snapshot_path())
+            exited = []
+            for filename in os.listdir(self.directory):
+                pid, ext = os.path.splitext(filename)
+                if ext != '.json' or filename == own or not pid.isdigit():
+                    continue
+                path = os.path.join(self.directory, filename)
+                if not process_alive(int(pid)):
+                    exited.append(path)
+                    continue
+                snapshot = read_snapshot(path)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+            archive = self.archive(exited)
+            if archive is not None:
+                snapshots.append(archive)
+
+        requests = {}
+        histograms = {name: {} for name in HISTOGRAMS}
+        for snapshot in snapshots:
+            merge_snapshot(requests, histograms, snapshot)
+        return requests, histograms
+
+    def render(self):
+        """Return the merged metrics in the Prometheus text exposition format."""
+        requests, histograms = self.collect()
+
+        lines = [f"# HELP {REQUESTS_TOTAL} {REQUEST_HELP}", f"# TYPE {REQUESTS_TOTAL} counter"]
+        for key in sorted(requests):
+            lines.append(f"{REQUESTS_TOTAL}{format_labels(REQUEST_LABELS, key)} {requests[key]}")
+
+        for name, (help_text, label_names, buckets) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels in sorted(histograms[name]):
+                series = histograms[name][labels]
+                cumulative = 0
+                for bound, count in zip(buckets, series):
+                    cumulative += count
+                    le = format_labels(label_names, labels, f'le="{format_value(bound)}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = format_labels(label_names, labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {series[-1]}")
+                lines.append(f"{name}_sum{format_labels(label_names, labels)} {format_value(series[-2])}")
+                lines.append(f"{name}_count{format_labels(label_names, labels)} {series[-1]}")
+        return '\n'.join(lines) + '\n'
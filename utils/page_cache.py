@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Page Cache
+
+This module keeps fully rendered HTML pages in memory, together with their
+strong ETag and precompressed ``br``/``gzip`` variants, so a cache hit is
+answered without running Jinja or compressing anything.
+
+Entries belong to a version (e.g. the templates, the asset bundle and the
+car catalog); when the current version changes, every page rendered for an
+older one is dropped at once. The cache is bounded by the total size of the
+stored bodies.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+try:
+    from utils.asset_bundle import ENCODINGS, MIN_COMPRESSION_SAVING, brotli_supported, compress
+    from utils.response_cache import make_etag
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from asset_bundle import ENCODINGS, MIN_COMPRESSION_SAVING, brotli_supported, compress
+    from response_cache import make_etag
+
+# Rendered page with its strong ETag (unquoted), mimetype and compressed
+# variants ({encoding: body}, in order of preference)
+CachedPage = namedtuple('CachedPage', ['body', 'etag', 'mimetype', 'variants'])
+
+
+def page_size(page):
+    """Return the number of bytes a cached page holds."""
+    return len(page.body) + sum(len(body) for body in page.variants.values())
+
+
+def directory_version(directory):
+    """
+    Return a digest of the names, sizes and modification times of a tree
+
+    Args:
+        directory (str): Directory to describe (e.g. the templates folder)
+
+    Returns:
+        str: Short hex digest, or None if the directory does not exist
+    """
+    if not os.path.isdir(directory):
+        return None
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(path, directory)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+class PageCache:
+    """
+    Thread-safe, size-bounded LRU cache of CachedPage objects
+
+    Call ``validate`` with the current version before looking pages up;
+    the version is also part of every key, so a page rendered for an old
+    version is never served for a new one.
+    """
+
+    def __init__(self, maxbytes=16 * 1024 * 1024):
+        self.maxbytes = maxbytes
+        self.version = None
+        self.size = 0
+        self.encodings = tuple(encoding for encoding, _ in ENCODINGS if encoding != 'br' or brotli_supported())
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def validate(self, version):
+        """
+        Drop all pages if the version changed
+
+        Args:
+            version (hashable): Everything the pages depend on besides
+                the request path (e.g. template and catalog versions)
+
+        Returns:
+            bool: True if the cache was invalidated
+        """
+        if version == self.version:
+            return False
+        with self._lock:
+            if version == self.version:
+                return False
+            self._entries.clear()
+            self.size = 0
+            self.version = version
+            return True
+
+    def get(self, key):
+        """Return the cached page for a key, or None."""
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        """Store a page, evicting the least recently used ones to stay within maxbytes."""
+        size = page_size(page)
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= page_size(old)
+            self._entries[key] = page
+            self.size += size
+            while self.size > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= page_size(evicted)
+
+    def compress_variants(self, body):
+        """Return the compressed variants of a body that are worth sending."""
+        variants = {}
+        for encoding in self.encodings:
+            compressed = compress(body, encoding)
+            if len(compressed) <= len(body) * (1 - MIN_COMPRESSION_SAVING):
+                variants[encoding] = compressed
+        return variants
+
+    def get_or_render(self, key, render, mimetype='text/html'):
+        """
+        Return the cached page for a key, rendering it on a miss
+
+        Args:
+            key (hashable): Cache key, including the version
+            render (callable): Returns the page as a string
+            mimetype (str): Mimetype of the page
+
+        Returns:
+            CachedPage: The cached page
+        """
+        page = self.get(key)
+        if page is None:
+            body = render().encode('utf-8')
+            page = CachedPage(body, make_etag(body), mimetype, self.compress_variants(body))
+            self.set(key, page)
+        return page
+
+    def negotiate(self, page, accept_encoding):
+        """
+        Pick the variant of a page to send
+
+        Args:
+            page (CachedPage): The cached page
+            accept_encoding (werkzeug.datastructures.Accept): The
+                request's parsed Accept-Encoding header
+
+        Returns:
+            tuple: (body, ETag, Content-Encoding or None); each encoding
+            has its own strong ETag
+        """
+        for encoding, body in page.variants.items():
+            if accept_encoding[encoding]:
+                return body, f"{page.etag}-{encoding}", encoding
+        return page.body, page.etag, None
+
+    def clear(self):
+        """Drop all cached pages."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
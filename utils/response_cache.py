@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Response Cache
+
+This module provides a bounded LRU cache of ready-made response bodies.
+Each entry carries a strong ETag computed from its bytes, so repeated
+requests can be answered without rebuilding or re-serializing the payload.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# Serialized response body with its strong ETag (unquoted) and mimetype
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'mimetype'])
+
+
+def make_etag(body):
+    """Return a strong ETag for a response body."""
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of CachedResponse objects
+
+    Keys should include everything the body depends on (e.g. the catalog
+    version and the query parameters), so entries never need to be
+    invalidated explicitly; stale ones simply fall out of the cache.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached response for a key, or None."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+            return cached
+
+    def set(self, key, cached):
+        """Store a cached response, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_create(self, key, build, mimetype='application/json'):
+        """
+        Return the cached response for a key, building it on a miss
+
+        Args:
+            key (hashable): Cache key
+            build (callable): Returns the response body as bytes
+            mimetype (str): Mimetype of the body
+
+        Returns:
+            CachedResponse: The cached response
+        """
+        cached = self.get(key)
+        if cached is None:
+            body = build()
+            cached = CachedResponse(body, make_etag(body), mimetype)
+            self.set(key, cached)
+        return cached
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
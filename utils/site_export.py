@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Static Site Export
+
+This script renders every page, every page of the gallery APIs and the
+sitemap through the Flask app and writes them to a directory as static
+files, with precompressed ``.br``/``.gz`` siblings, so nginx or a CDN can
+serve the whole site without running Python.
+
+A URL's query string becomes part of its file name
+(``/api/gallery/images?page=2&per_page=9`` is written to
+``api/gallery/images/page=2&per_page=9.json``). Re-exports compare each
+response with the hash recorded in the export manifest and only rewrite
+the files whose content changed; outputs of URLs that are gone are removed.
+The manifest is kept next to the export directory, so it is not published.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import mimetypes
+import posixpath
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    from utils.asset_bundle import ENCODINGS, MIN_COMPRESSION_SAVING, brotli_supported, compress
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from asset_bundle import ENCODINGS, MIN_COMPRESSION_SAVING, brotli_supported, compress
+
+# Manifest of the export directory <name>, written next to it
+EXPORT_MANIFEST = '.{name}-manifest.json'
+DEFAULT_OUTPUT = 'export'
+# Host written into the sitemap, as in the canonical URLs of the templates
+DEFAULT_BASE_URL = 'https://enamsaturentalindo.com'
+# Endpoints served from disk by the web server, or that must stay live
+SKIPPED_ENDPOINTS = {'static', 'bundled_asset', 'media_video', 'prometheus_metrics'}
+LINK_NEXT_PATTERN = re.compile(r'<([^>]+)>;\s*rel="next"')
+SITEMAP_LOC_PATTERN = re.compile(r'<sitemap><loc>([^<]+)</loc>')
+
+
+def output_path(url, mimetype):
+    """
+    Return the file an exported URL is written to, relative to the export
+
+    Args:
+        url (str): Path and query string (e.g. '/gallery')
+        mimetype (str): Mimetype of the response
+
+    Returns:
+        str: '/' -> 'index.html', '/gallery' -> 'gallery/index.html',
+        '/sitemap.xml' -> 'sitemap.xml', '/api/cars' -> 'api/cars/index.json',
+        '/api/x?page=2' -> 'api/x/page=2.json'
+    """
+    path, _, query = url.partition('?')
+    path = path.strip('/')
+    if posixpath.splitext(path)[1] and not query:
+        return path
+    extension = mimetypes.guess_extension(mimetype) or ''
+    return posixpath.join(path, f"{query or 'index'}{extension}")
+
+
+def manifest_path(output_dir):
+    """Return the path of an export directory's manifest, a sibling of the directory."""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(EXPORT_MANIFEST.format(name=output_dir.name))
+
+
+def route_urls(app, skipped=SKIPPED_ENDPOINTS):
+    """Return the URLs of the app's GET routes that take no arguments (besides defaults)."""
+    return sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if 'GET' in rule.methods and not rule.arguments - set(rule.defaults or ())
+        and rule.endpoint not in skipped
+    )
+
+
+def discover_urls(response, base_url):
+    """Return the URLs a response points to: its next page and the parts of a sitemap index."""
+    urls = LINK_NEXT_PATTERN.findall(response.headers.get('Link', ''))
+    if response.mimetype == 'application/xml':
+        base = urlsplit(base_url)
+        for loc in SITEMAP_LOC_PATTERN.findall(response.get_data(as_text=True)):
+            parts = urlsplit(loc)
+            if parts.netloc == base.netloc:
+                urls.append(parts.path)
+    return urls
+
+
+def write_output(output_dir, relpath, body, encodings):
+    """
+    Write an exported file and its precompressed siblings
+
+    Returns:
+        list: Encodings written next to the file
+    """
+    target = Path(output_dir) / relpath
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, target)
+
+    written = []
+    for encoding, suffix in ENCODINGS:
+        variant = Path(f"{target}{suffix}")
+        compressed = compress(body, encoding) if encoding in encodings else None
+        if compressed is not None and len(compressed) <= len(body) * (1 - MIN_COMPRESSION_SAVING):
+            variant.write_bytes(compressed)
+            written.append(encoding)
+        elif variant.exists():
+            variant.unlink()
+    return written
+
+
+def remove_output(output_dir, relpath):
+    """Remove an exported file and its precompressed siblings."""
+    target = Path(output_dir) / relpath
+    for path in [target] + [Path(f"{target}{suffix}") for _, suffix in ENCODINGS]:
+        if path.exists():
+            path.unlink()
+
+
+def export_site(app, output_dir, start_urls, base_url=DEFAULT_BASE_URL, aliases=None, force=False):
+    """
+    Crawl the app and write its responses as static files
+
+    Starting from start_urls, the crawler follows ``Link: rel="next"``
+    headers and the parts of a sitemap index.
+
+    Args:
+        app (flask.Flask): The app to export
+        output_dir (str): Export directory
+        start_urls (list): URLs (path and query string) to export
+        base_url (str): Scheme and host the site is served from
+        aliases (dict): URLs to export with the response of another URL
+            (e.g. a fixed seed for a random mix)
+        force (bool): Rewrite all files, even if their content is unchanged
+
+    Returns:
+        tuple: (manifest, failed URLs)
+    """
+    aliases = aliases or {}
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = manifest_path(output_dir)
+    # Exports made before the manifest moved out of the directory kept it inside
+    legacy_file = output_dir / '.export-manifest.json'
+    previous = {}
+    for path in (manifest_file, legacy_file):
+        try:
+            with open(path) as f:
+                previous = json.load(f).get('urls', {})
+            break
+        except (OSError, ValueError):
+            continue
+
+    encodings = tuple(encoding for encoding, _ in ENCODINGS if encoding != 'br' or brotli_supported())
+    if 'br' not in encodings:
+        print("brotli is not installed, writing gzip variants only (pip install brotli)")
+
+    start = time.perf_counter()
+    client = app.test_client()
+    urls = {}
+    failed = []
+    written = 0
+    queue = list(start_urls)
+    seen = set(queue)
+    while queue:
+        url = queue.pop(0)
+        response = client.get(aliases.get(url, url), base_url=base_url)
+        if response.status_code != 200:
+            print(f"Error exporting {url}: HTTP {response.status_code}")
+            failed.append(url)
+            continue
+
+        body = response.get_data()
+        relpath = output_path(url, response.mimetype)
+        digest = hashlib.sha256(body).hexdigest()
+        entry = previous.get(url)
+        if force or not entry or entry['file'] != relpath or entry['sha256'] != digest \
+                or not (output_dir / relpath).exists():
+            entry = {'file': relpath, 'sha256': digest,
+                     'encodings': write_output(output_dir, relpath, body, encodings)}
+            written += 1
+        urls[url] = entry
+
+        for link in discover_urls(response, base_url):
+            if link not in seen:
+                seen.add(link)
+                queue.append(link)
+
+    # Remove the files of URLs that are no longer exported
+    current = {entry['file'] for entry in urls.values()}
+    removed = 0
+    for url, entry in previous.items():
+        if entry['file'] not in current:
+            remove_output(output_dir, entry['file'])
+            removed += 1
+
+    manifest = {'base_url': base_url, 'urls': urls}
+    tmp_path = manifest_file.with_name(f"{manifest_file.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_file)
+    if legacy_file.exists():
+        legacy_file.unlink()
+
+    print(f"Exported {len(urls)} URLs ({written} rewritten, {removed} removed, {len(failed)} failed) "
+          f"in {time.perf_counter() - start:.2f}s to {output_dir}")
+    return manifest, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the site as static, precompressed files")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f"Export directory (default: {DEFAULT_OUTPUT})")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL,
+                        help=f"Scheme and host the site is served from (default: {DEFAULT_BASE_URL})")
+    parser.add_argument('--force', action='store_true', help="Rewrite all files, even if unchanged")
+
+    args = parser.parse_args()
+
+    from app import app, media_catalog, GALLERY_IMAGES_PER_PAGE, GALLERY_VIDEOS_PER_PAGE
+
+    # The API URLs the page scripts request, in the order they build them
+    start_urls = route_urls(app) + [
+        f"/api/gallery/images?page=1&per_page={GALLERY_IMAGES_PER_PAGE}",
+        f"/api/gallery/videos?page=1&per_page={GALLERY_VIDEOS_PER_PAGE}",
+        "/api/gallery/random?count=8",
+    ]
+    # Freeze the random mix with a seed derived from the media, so it only
+    # changes (and is only rewritten) when the media does
+    seed = int((media_catalog.version or '0')[:8], 16)
+    aliases = {
+        "/api/gallery/random": f"/api/gallery/random?seed={seed}",
+        "/api/gallery/random?count=8": f"/api/gallery/random?count=8&seed={seed}",
+    }
+
+    _, failed = export_site(app, args.output, start_urls, args.base_url, aliases, args.force)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Sitemap Builder
+
+This module serializes sitemap URLs, with their image and video extension
+entries, into sitemap documents. When the URLs exceed the limits of the
+sitemap protocol (50,000 URLs or 50 MB per file), they are split over
+several sitemaps listed in a sitemap index.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+IMAGE_NS = 'http://www.google.com/schemas/sitemap-image/1.1'
+VIDEO_NS = 'http://www.google.com/schemas/sitemap-video/1.1'
+
+# Protocol limits per sitemap file
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+# Search engines read at most this many images per page
+MAX_IMAGES_PER_URL = 1000
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = f'<urlset xmlns="{SITEMAP_NS}" xmlns:image="{IMAGE_NS}" xmlns:video="{VIDEO_NS}">'
+URLSET_CLOSE = '</urlset>\n'
+
+# A page of the site: lastmod is a Unix timestamp, images a list of image
+# URLs and videos a list of dicts with thumbnail_loc, title, description
+# and content_loc
+SitemapUrl = namedtuple('SitemapUrl', ['loc', 'lastmod', 'changefreq', 'priority', 'images', 'videos'])
+
+
+def w3c_datetime(timestamp):
+    """Format a Unix timestamp as a W3C datetime in UTC."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def url_element(url):
+    """Serialize a SitemapUrl to its <url> element."""
+    parts = [f"<url><loc>{escape(url.loc)}</loc>"]
+    if url.lastmod:
+        parts.append(f"<lastmod>{w3c_datetime(url.lastmod)}</lastmod>")
+    if url.changefreq:
+        parts.append(f"<changefreq>{url.changefreq}</changefreq>")
+    if url.priority is not None:
+        parts.append(f"<priority>{url.priority}</priority>")
+    for image in url.images[:MAX_IMAGES_PER_URL]:
+        parts.append(f"<image:image><image:loc>{escape(image)}</image:loc></image:image>")
+    for video in url.videos:
+        parts.append(
+            "<video:video>"
+            f"<video:thumbnail_loc>{escape(video['thumbnail_loc'])}</video:thumbnail_loc>"
+            f"<video:title>{escape(video['title'])}</video:title>"
+            f"<video:description>{escape(video['description'])}</video:description>"
+            f"<video:content_loc>{escape(video['content_loc'])}</video:content_loc>"
+            "</video:video>"
+        )
+    parts.append("</url>")
+    return ''.join(parts)
+
+
+def build_sitemaps(urls, part_url, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+    """
+    Serialize URLs into one sitemap, or a sitemap index and its parts
+
+    Args:
+        urls (list): SitemapUrl objects
+        part_url (callable): Returns the absolute URL of part n (1-based)
+        max_urls (int): Most URLs per sitemap
+        max_bytes (int): Largest size of a sitemap in bytes
+
+    Returns:
+        list: Documents as bytes; the first is served as /sitemap.xml and
+        is either the only sitemap or the index of the following parts
+    """
+    overhead = len(XML_DECLARATION) + len(URLSET_OPEN) + len(URLSET_CLOSE)
+    parts = []
+    elements, size, lastmod = [], overhead, 0
+    for url in urls:
+        element = url_element(url).encode('utf-8')
+        if elements and (len(elements) >= max_urls or size + len(element) > max_bytes):
+            parts.append((elements, lastmod))
+            elements, size, lastmod = [], overhead, 0
+        elements.append(element)
+        size += len(element)
+        lastmod = max(lastmod, url.lastmod or 0)
+    if elements or not parts:
+        parts.append((elements, lastmod))
+
+    documents = [
+        (XML_DECLARATION + URLSET_OPEN).encode() + b''.join(elements) + URLSET_CLOSE.encode()
+        for elements, _ in parts
+    ]
+    if len(documents) == 1:
+        return documents
+
+    index = [XML_DECLARATION, f'<sitemapindex xmlns="{SITEMAP_NS}">']
+    for n, (_, lastmod) in enumerate(parts, start=1):
+        index.append(f"<sitemap><loc>{escape(part_url(n))}</loc>")
+        if lastmod:
+            index.append(f"<lastmod>{w3c_datetime(lastmod)}</lastmod>")
+        index.append("</sitemap>")
+    index.append('</sitemapindex>\n')
+    return [''.join(index).encode('utf-8')] + documents
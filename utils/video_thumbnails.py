@@ -4,15 +4,206 @@ Video Thumbnail Generator
 
 This script extracts thumbnail images from video files.
 It uses OpenCV to capture frames from videos and saves them as image files.
+It can also build preview sprite sheets: a grid of evenly spaced frames in
+one WebP image, with a JSON and a WebVTT index of the frame timings.
 """
 
 import os
 import sys
+import json
+import math
+import time
 import argparse
 import cv2
 from pathlib import Path
 from PIL import Image, ImageEnhance
 
+try:
+    from utils.batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+
+
+# Gap (in seconds of video) above which seeking is cheaper than decoding
+# forward; roughly one keyframe interval for typical phone/camera footage
+KEYFRAME_INTERVAL = 2.0
+# Frames are area-reduced by an integer factor to no less than this many
+# times the target width before the color conversion and the final
+# Lanczos resize
+REDUCING_GAP = 2
+
+
+def extract_frames(video_path, timestamps, keyframe_interval=KEYFRAME_INTERVAL):
+    """
+    Extract several frames from a video in a single decode pass
+    
+    The video is opened once and the timestamps are visited in sorted order.
+    Nearby targets are reached by decoding forward (grab) from the current
+    position; only gaps longer than ``keyframe_interval`` trigger a seek,
+    which makes the decoder restart from the preceding keyframe.
+    
+    Args:
+        video_path (str): Path to the video file
+        timestamps (list): Times in seconds; values beyond the video duration
+            are replaced by the middle of the video
+        keyframe_interval (float): Gap in seconds above which to seek
+        
+    Returns:
+        list: (timestamp, frame) tuples in the order of ``timestamps``, where
+        frame is a BGR numpy array or None if it could not be read; None if
+        the video could not be opened
+    """
+    video = cv2.VideoCapture(str(video_path))
+    
+    # Check if video opened successfully
+    if not video.isOpened():
+        print(f"Error: Could not open video {video_path}")
+        return None
+    
+    try:
+        # Get video properties
+        fps = video.get(cv2.CAP_PROP_FPS)
+        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = total_frames / fps if fps > 0 else 0
+        
+        resolved = []
+        for timestamp in timestamps:
+            # If timestamp is beyond video duration, use middle of video
+            if timestamp > duration:
+                print(f"Warning: Timestamp {timestamp}s exceeds video duration {duration:.2f}s, using middle frame")
+                timestamp = duration / 2
+            resolved.append((timestamp, int(timestamp * fps)))
+        
+        seek_gap = max(1, int(keyframe_interval * fps))
+        frames = {}
+        position = 0  # Index of the next frame the decoder returns
+        for frame_number in sorted({frame_number for _, frame_number in resolved}):
+            gap = frame_number - position
+            if gap < 0 or gap > seek_gap:
+                video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            else:
+                # Decode forward without converting the skipped frames
+                for _ in range(gap):
+                    if not video.grab():
+                        break
+            
+            success, frame = video.read()
+            frames[frame_number] = frame if success else None
+            position = frame_number + 1
+        
+        return [(timestamp, frames[frame_number]) for timestamp, frame_number in resolved]
+    finally:
+        # Close the video file
+        video.release()
+
+
+def get_video_duration(video_path):
+    """Return the duration of a video in seconds, or None if it cannot be opened."""
+    video = cv2.VideoCapture(str(video_path))
+    try:
+        if not video.isOpened():
+            return None
+        fps = video.get(cv2.CAP_PROP_FPS)
+        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        return total_frames / fps if fps > 0 else 0
+    finally:
+        video.release()
+
+
+def format_vtt_time(seconds):
+    """Format seconds as a WebVTT timestamp (HH:MM:SS.mmm)."""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def frame_to_image(frame, width=None, enhance=False, brightness=1.0, contrast=1.0, saturation=1.2):
+    """
+    Convert an OpenCV frame to a resized, optionally enhanced PIL image
+    
+    A frame much wider than ``width`` is first shrunk with an area filter,
+    which averages the source pixels, so the color conversion and the
+    Lanczos resize only process a fraction of a full HD or 4K frame.
+    
+    Args:
+        frame (numpy.ndarray): BGR frame as returned by OpenCV
+        width (int): Resize width (keeps aspect ratio if set)
+        enhance (bool): Whether to enhance the image
+        brightness (float): Brightness factor (1.0 = original)
+        contrast (float): Contrast factor (1.0 = original)
+        saturation (float): Saturation factor (1.0 = original)
+        
+    Returns:
+        PIL.Image.Image: The converted image
+    """
+    frame_height, frame_width = frame.shape[:2]
+    factor = frame_width // (width * REDUCING_GAP) if width else 0
+    box = None
+    if factor >= 2:
+        # Average factor x factor blocks (OpenCV's fast path for integer
+        # factors), repeating the edge pixels to complete the last blocks
+        pad_bottom, pad_right = -frame_height % factor, -frame_width % factor
+        if pad_bottom or pad_right:
+            frame = cv2.copyMakeBorder(frame, 0, pad_bottom, 0, pad_right, cv2.BORDER_REPLICATE)
+        reduced_size = (frame.shape[1] // factor, frame.shape[0] // factor)
+        frame = cv2.resize(frame, reduced_size, interpolation=cv2.INTER_AREA)
+        # Resample only the part of the reduced frame covering the original
+        box = (0, 0, frame_width / factor, frame_height / factor)
+    
+    # Convert BGR to RGB (OpenCV uses BGR, PIL uses RGB)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
+    # Convert to PIL Image
+    img = Image.fromarray(frame_rgb)
+    
+    # Resize if width is specified
+    if width is not None:
+        # Aspect ratio of the original frame, not the area-reduced one
+        aspect_ratio = frame_width / frame_height
+        new_height = int(width / aspect_ratio)
+        img = img.resize((width, new_height), Image.LANCZOS, box=box)
+    
+    # Enhance image if requested
+    if enhance:
+        # Brightness
+        if brightness != 1.0:
+            enhancer = ImageEnhance.Brightness(img)
+            img = enhancer.enhance(brightness)
+        
+        # Contrast
+        if contrast != 1.0:
+            enhancer = ImageEnhance.Contrast(img)
+            img = enhancer.enhance(contrast)
+        
+        # Saturation
+        if saturation != 1.0:
+            enhancer = ImageEnhance.Color(img)
+            img = enhancer.enhance(saturation)
+    
+    return img
+
+
+def save_image(img, output_path, quality=85, format='webp'):
+    """
+    Save a PIL image in the requested format
+    
+    Returns:
+        str: Path to the saved image, or None for an unsupported format
+    """
+    if format.lower() == 'webp':
+        img.save(str(output_path), 'WEBP', quality=quality)
+    elif format.lower() == 'jpg' or format.lower() == 'jpeg':
+        img.save(str(output_path), 'JPEG', quality=quality)
+    elif format.lower() == 'png':
+        img.save(str(output_path), 'PNG')
+    else:
+        print(f"Error: Unsupported format {format}")
+        return None
+    return str(output_path)
+
 
 def extract_thumbnail(video_path, output_path=None, timestamp=1.0, quality=85, format='webp', 
                       enhance=False, width=None, brightness=1.0, contrast=1.0, saturation=1.2):
@@ -52,78 +243,19 @@ def extract_thumbnail(video_path, output_path=None, timestamp=1.0, quality=85, f
             output_path = output_path / f"{video_file.stem}_thumbnail.{format.lower()}"
     
     try:
-        # Open the video file
-        video = cv2.VideoCapture(str(video_file))
-        
-        # Check if video opened successfully
-        if not video.isOpened():
-            print(f"Error: Could not open video {video_path}")
+        frames = extract_frames(video_file, [timestamp])
+        if frames is None:
             return None
         
-        # Get video properties
-        fps = video.get(cv2.CAP_PROP_FPS)
-        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps if fps > 0 else 0
-        
-        # If timestamp is beyond video duration, use middle of video
-        if timestamp > duration:
-            print(f"Warning: Timestamp {timestamp}s exceeds video duration {duration:.2f}s, using middle frame")
-            timestamp = duration / 2
-        
-        # Convert timestamp to frame number
-        frame_number = int(timestamp * fps)
-        
-        # Set video position to the specified frame
-        video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        
-        # Read the frame
-        success, frame = video.read()
-        
-        # Close the video file
-        video.release()
-        
-        if not success:
+        timestamp, frame = frames[0]
+        if frame is None:
             print(f"Error: Could not read frame at {timestamp}s from {video_path}")
             return None
         
-        # Convert BGR to RGB (OpenCV uses BGR, PIL uses RGB)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Convert to PIL Image
-        img = Image.fromarray(frame_rgb)
-        
-        # Resize if width is specified
-        if width is not None:
-            aspect_ratio = img.width / img.height
-            new_height = int(width / aspect_ratio)
-            img = img.resize((width, new_height), Image.LANCZOS)
-        
-        # Enhance image if requested
-        if enhance:
-            # Brightness
-            if brightness != 1.0:
-                enhancer = ImageEnhance.Brightness(img)
-                img = enhancer.enhance(brightness)
-            
-            # Contrast
-            if contrast != 1.0:
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(contrast)
-            
-            # Saturation
-            if saturation != 1.0:
-                enhancer = ImageEnhance.Color(img)
-                img = enhancer.enhance(saturation)
+        img = frame_to_image(frame, width, enhance, brightness, contrast, saturation)
         
         # Save the image
-        if format.lower() == 'webp':
-            img.save(str(output_path), 'WEBP', quality=quality)
-        elif format.lower() == 'jpg' or format.lower() == 'jpeg':
-            img.save(str(output_path), 'JPEG', quality=quality)
-        elif format.lower() == 'png':
-            img.save(str(output_path), 'PNG')
-        else:
-            print(f"Error: Unsupported format {format}")
+        if save_image(img, output_path, quality, format) is None:
             return None
         
         print(f"Thumbnail saved to {output_path}")
@@ -134,12 +266,195 @@ def extract_thumbnail(video_path, output_path=None, timestamp=1.0, quality=85, f
         return None
 
 
+def extract_thumbnails(video_path, timestamps, output_dir, quality=85, format='webp', 
+                       enhance=False, width=None, brightness=1.0, contrast=1.0, saturation=1.2):
+    """
+    Extract thumbnails at several timestamps from one decode pass
+    
+    Each thumbnail is saved as ``<video stem>_<milliseconds>.<format>`` in
+    the output directory, e.g. to offer several poster candidates.
+    
+    Args:
+        video_path (str): Path to the video file
+        timestamps (list): Times in seconds to extract frames
+        output_dir (str): Directory to save the thumbnails
+        (remaining arguments as for extract_thumbnail)
+        
+    Returns:
+        list: Paths of the saved thumbnails
+    """
+    video_file = Path(video_path)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        frames = extract_frames(video_file, timestamps)
+    except Exception as e:
+        print(f"Error processing {video_path}: {e}")
+        return []
+    
+    saved = []
+    for timestamp, frame in frames or []:
+        if frame is None:
+            print(f"Error: Could not read frame at {timestamp}s from {video_path}")
+            continue
+        img = frame_to_image(frame, width, enhance, brightness, contrast, saturation)
+        thumbnail_path = output_path / f"{video_file.stem}_{int(timestamp * 1000)}.{format.lower()}"
+        if save_image(img, thumbnail_path, quality, format):
+            saved.append(str(thumbnail_path))
+    
+    print(f"Saved {len(saved)} thumbnails for {video_path}")
+    return saved
+
+
+def write_atomically(path, write, mode='w'):
+    """
+    Write a file through a temporary sibling, so readers never see a partial file
+    
+    Args:
+        path (Path): File to write
+        write (callable): Called with the open temporary file
+        mode (str): 'w' for text or 'wb' for binary
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def check_sprite_options(frames, tile_width, columns):
+    """
+    Check the sprite sheet layout before any video is decoded
+
+    Raises:
+        ValueError: If the frame count, tile width or column count is not
+            a positive integer
+    """
+    for name, value in (('frames', frames), ('tile_width', tile_width), ('columns', columns)):
+        if not isinstance(value, int) or value < 1:
+            raise ValueError(f"Sprite {name} must be a positive integer, got {value!r}")
+
+
+def generate_sprite_sheet(video_path, output_dir, frames=10, tile_width=160, columns=5, quality=70):
+    """
+    Build a preview sprite sheet of evenly spaced frames from a video
+    
+    All frames come from a single decode pass (see extract_frames). Three
+    files are written to the output directory:
+    
+    - ``<stem>_sprite.webp``: the frames tiled left to right, top to bottom
+    - ``<stem>_sprite.json``: tile size, grid and the time of each frame
+    - ``<stem>_sprite.vtt``: WebVTT thumbnail track (``#xywh`` fragments)
+    
+    Args:
+        video_path (str): Path to the video file
+        output_dir (str): Directory to save the sprite files
+        frames (int): Number of frames in the sprite
+        tile_width (int): Width of each tile in pixels (keeps aspect ratio)
+        columns (int): Number of tiles per row
+        quality (int): WebP quality (0-100)
+        
+    Returns:
+        str: Path to the JSON index, or None on failure
+
+    Raises:
+        ValueError: If frames, tile_width or columns is not positive
+    """
+    check_sprite_options(frames, tile_width, columns)
+    video_file = Path(video_path)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    duration = get_video_duration(video_file)
+    if not duration:
+        print(f"Error: Could not read duration of {video_path}")
+        return None
+    
+    # Sample the middle of each of the equal segments of the video
+    step = duration / frames
+    timestamps = [step * (i + 0.5) for i in range(frames)]
+    extracted = [(t, frame) for t, frame in extract_frames(video_file, timestamps) or [] if frame is not None]
+    if not extracted:
+        print(f"Error: Could not read frames from {video_path}")
+        return None
+    
+    tiles = [frame_to_image(frame, tile_width) for _, frame in extracted]
+    tile_height = tiles[0].height
+    columns = min(columns, len(tiles))
+    rows = math.ceil(len(tiles) / columns)
+    
+    sprite = Image.new('RGB', (tile_width * columns, tile_height * rows))
+    index = []
+    for i, ((timestamp, _), tile) in enumerate(zip(extracted, tiles)):
+        x, y = (i % columns) * tile_width, (i // columns) * tile_height
+        sprite.paste(tile.resize((tile_width, tile_height)), (x, y))
+        index.append({'time': round(timestamp, 3), 'x': x, 'y': y})
+    
+    sprite_name = f"{video_file.stem}_sprite.webp"
+    write_atomically(output_path / sprite_name, lambda f: sprite.save(f, 'WEBP', quality=quality), 'wb')
+    
+    # WebVTT cue for each tile, covering its segment of the video
+    cues = ['WEBVTT', '']
+    for i, entry in enumerate(index):
+        start = 0 if i == 0 else (index[i - 1]['time'] + entry['time']) / 2
+        end = duration if i == len(index) - 1 else (entry['time'] + index[i + 1]['time']) / 2
+        cues.append(f"{format_vtt_time(start)} --> {format_vtt_time(end)}")
+        cues.append(f"{sprite_name}#xywh={entry['x']},{entry['y']},{tile_width},{tile_height}")
+        cues.append('')
+    vtt_name = f"{video_file.stem}_sprite.vtt"
+    write_atomically(output_path / vtt_name, lambda f: f.write('\n'.join(cues)))
+    
+    # The index goes last: the gallery picks up a sprite through its index
+    json_path = output_path / f"{video_file.stem}_sprite.json"
+    sprite_index = {
+        'video': video_file.name,
+        'sprite': sprite_name,
+        'vtt': vtt_name,
+        'duration': round(duration, 3),
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'columns': columns,
+        'rows': rows,
+        'frames': index,
+    }
+    write_atomically(json_path, lambda f: json.dump(sprite_index, f, indent=1))
+    
+    print(f"Sprite sheet saved to {output_path / sprite_name} ({len(index)} frames)")
+    return str(json_path)
+
+
+def _sprite_task(video_file, *options):
+    """Batch worker: build one sprite sheet, raising if it failed."""
+    output = generate_sprite_sheet(video_file, *options)
+    if output is None:
+        raise RuntimeError(f"No sprite sheet generated for {video_file}")
+    return output
+
+
+def _thumbnail_task(video_file, output_path, timestamp, quality, format, *options):
+    """Batch worker: extract one thumbnail, raising if it failed."""
+    # Just keep the filename, not subdirectories
+    video_output = None
+    if output_path is not None:
+        video_output = output_path / f"{video_file.stem}_thumbnail.{format.lower()}"
+    
+    output = extract_thumbnail(video_file, video_output, timestamp, quality, format, *options)
+    if output is None:
+        raise RuntimeError(f"No thumbnail generated for {video_file}")
+    return output
+
+
 def process_videos(directory, output_dir=None, timestamp=1.0, quality=85, format='webp', 
                   enhance=False, width=None, recursive=True, 
-                  brightness=1.0, contrast=1.0, saturation=1.2):
+                  brightness=1.0, contrast=1.0, saturation=1.2, jobs=1, timeout=None):
     """
     Process all videos in a directory
     
+    With ``jobs`` greater than 1, videos are decoded, resized and encoded
+    concurrently on a bounded pool of worker processes. With a ``timeout``,
+    a video that takes longer (e.g. a corrupt file hanging the decoder) is
+    killed and reported as failed instead of stalling the batch.
+    
     Args:
         directory (str): Directory containing videos
         output_dir (str): Directory to save thumbnails
@@ -152,6 +467,11 @@ def process_videos(directory, output_dir=None, timestamp=1.0, quality=85, format
         brightness (float): Brightness factor (1.0 = original)
         contrast (float): Contrast factor (1.0 = original)
         saturation (float): Saturation factor (1.0 = original)
+        jobs (int): Number of worker processes (0 uses every CPU core)
+        timeout (float): Per-video time limit in seconds
+        
+    Returns:
+        list: BatchResult objects, one per video
     """
     # Get directory as Path object
     dir_path = Path(directory)
@@ -159,7 +479,7 @@ def process_videos(directory, output_dir=None, timestamp=1.0, quality=85, format
     # Check if directory exists
     if not dir_path.exists():
         print(f"Error: Directory {directory} does not exist")
-        return
+        return []
     
     # Create output directory if specified
     if output_dir is not None:
@@ -177,37 +497,72 @@ def process_videos(directory, output_dir=None, timestamp=1.0, quality=85, format
     else:
         all_files = list(dir_path.glob('*.*'))
     
-    # Filter video files
-    video_files = [f for f in all_files if f.suffix.lower() in video_extensions]
+    # Filter video files, sorted so runs are reproducible
+    video_files = sorted(f for f in all_files if f.suffix.lower() in video_extensions)
     
     if not video_files:
         print(f"No videos found in {directory}")
-        return
+        return []
     
-    print(f"Found {len(video_files)} videos to process")
+    jobs = min(resolve_jobs(jobs), len(video_files))
+    print(f"Found {len(video_files)} videos to process using {jobs} worker(s)")
     
     # Process all videos
-    processed_count = 0
-    for video_file in video_files:
-        # Create output path for this video
-        if output_path is not None:
-            # Preserve directory structure if recursive
-            if recursive:
-                rel_path = video_file.relative_to(dir_path)
-                # Just keep the filename, not subdirectories
-                video_output = output_path / f"{rel_path.stem}_thumbnail.{format.lower()}"
-            else:
-                video_output = output_path / f"{video_file.stem}_thumbnail.{format.lower()}"
-        else:
-            video_output = None
-        
-        if extract_thumbnail(
-            video_file, video_output, timestamp, quality, format, 
-            enhance, width, brightness, contrast, saturation
-        ):
-            processed_count += 1
+    options = (output_path, timestamp, quality, format, enhance, width, brightness, contrast, saturation)
+    start = time.perf_counter()
+    results = run_batch(_thumbnail_task, video_files, options, jobs, print_progress, timeout)
+    elapsed = time.perf_counter() - start
     
+    processed_count = sum(1 for result in results if result.ok)
     print(f"Processing complete. Generated {processed_count} thumbnails.")
+    print_batch_report(results, elapsed, jobs, 'videos')
+    return results
+
+
+def process_sprites(directory, output_dir, frames=10, tile_width=160, columns=5, quality=70,
+                    recursive=True, jobs=1, timeout=None):
+    """
+    Build preview sprite sheets for all videos in a directory
+    
+    Args:
+        directory (str): Directory containing videos
+        output_dir (str): Directory to save the sprite sheets
+        frames (int): Number of frames per sprite
+        tile_width (int): Width of each tile in pixels
+        columns (int): Number of tiles per row
+        quality (int): WebP quality (0-100)
+        recursive (bool): Whether to process subdirectories
+        jobs (int): Number of worker processes (0 uses every CPU core)
+        timeout (float): Per-video time limit in seconds
+        
+    Returns:
+        list: BatchResult objects, one per video
+
+    Raises:
+        ValueError: If frames, tile_width or columns is not positive
+    """
+    check_sprite_options(frames, tile_width, columns)
+    dir_path = Path(directory)
+    if not dir_path.exists():
+        print(f"Error: Directory {directory} does not exist")
+        return []
+    
+    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv'}
+    pattern = '**/*.*' if recursive else '*.*'
+    video_files = sorted(f for f in dir_path.glob(pattern) if f.suffix.lower() in video_extensions)
+    
+    if not video_files:
+        print(f"No videos found in {directory}")
+        return []
+    
+    jobs = min(resolve_jobs(jobs), len(video_files))
+    print(f"Building {frames}-frame sprite sheets for {len(video_files)} videos using {jobs} worker(s)")
+    
+    options = (output_dir, frames, tile_width, columns, quality)
+    start = time.perf_counter()
+    results = run_batch(_sprite_task, video_files, options, jobs, print_progress, timeout)
+    print_batch_report(results, time.perf_counter() - start, jobs, 'videos')
+    return results
 
 
 def main():
@@ -239,25 +594,56 @@ def main():
     parser.add_argument('--saturation', type=float, default=1.2,
                       help="Saturation adjustment factor (default: 1.2)")
     
+    # Sprite sheet options
+    parser.add_argument('--sprites', action='store_true',
+                      help="Build preview sprite sheets instead of single thumbnails")
+    parser.add_argument('--sprite-output', default='static/assets/thumbnails/sprites',
+                      help="Directory to save sprite sheets (default: static/assets/thumbnails/sprites)")
+    parser.add_argument('--sprite-frames', type=int, default=10,
+                      help="Number of frames per sprite sheet (default: 10)")
+    parser.add_argument('--sprite-width', type=int, default=160,
+                      help="Width of each sprite tile in pixels (default: 160)")
+    parser.add_argument('--sprite-columns', type=int, default=5,
+                      help="Number of tiles per sprite row (default: 5)")
+    
     # Other options
     parser.add_argument('--no-recursive', action='store_true',
                       help="Don't process subdirectories")
+    parser.add_argument('--jobs', type=int, default=1,
+                      help="Number of videos processed in parallel, 0 uses all CPU cores (default: 1)")
+    parser.add_argument('--timeout', type=float, default=120,
+                      help="Seconds before a single video is abandoned, 0 disables (default: 120)")
     
     args = parser.parse_args()
     
+    if args.sprites:
+        try:
+            check_sprite_options(args.sprite_frames, args.sprite_width, args.sprite_columns)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Building sprite sheets from videos in '{args.dir}'")
+        print(f"Saving sprite sheets to '{args.sprite_output}'")
+        results = process_sprites(
+            args.dir, args.sprite_output, args.sprite_frames, args.sprite_width,
+            args.sprite_columns, recursive=not args.no_recursive,
+            jobs=args.jobs, timeout=args.timeout or None
+        )
+        return 1 if any(not result.ok for result in results) else 0
+    
     # Create output directory if it doesn't exist
     os.makedirs(args.output, exist_ok=True)
     
     # Process videos
     print(f"Generating thumbnails from videos in '{args.dir}'")
     print(f"Saving thumbnails to '{args.output}'")
-    process_videos(
+    results = process_videos(
         args.dir, args.output, args.timestamp, args.quality, args.format,
         args.enhance, args.width, not args.no_recursive,
-        args.brightness, args.contrast, args.saturation
+        args.brightness, args.contrast, args.saturation,
+        args.jobs, args.timeout or None
     )
     
-    return 0
+    return 1 if any(not result.ok for result in results) else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Video Rendition Transcoder
+
+This script transcodes videos into size-capped H.264/AAC MP4 renditions
+(e.g. 480p and 720p) for progressive playback. Every rendition has its
+moov atom at the front of the file (faststart), so playback and seeking can
+begin before the whole file is downloaded. A manifest describes the
+renditions of each source video.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+
+import cv2
+
+try:
+    from utils.batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+    from utils.build_cache import BuildCache, default_cache_path
+    from utils.media_catalog import save_catalog_snapshot
+except ImportError:
+    # Allow running this file directly as a script from inside utils/
+    from batch_runner import run_batch, resolve_jobs, print_progress, print_batch_report
+    from build_cache import BuildCache, default_cache_path
+    from media_catalog import save_catalog_snapshot
+
+# (name, short side in pixels, maximum video bitrate)
+RENDITIONS = (
+    ('480p', 480, '900k'),
+    ('720p', 720, '2000k'),
+)
+RENDITION_MANIFEST = 'manifest.json'
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm'}
+
+
+def get_video_size(video_path):
+    """Return (width, height) of a video, or None if it cannot be opened."""
+    video = cv2.VideoCapture(str(video_path))
+    try:
+        if not video.isOpened():
+            return None
+        return int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        video.release()
+
+
+def rendition_size(width, height, short_side):
+    """Scale (width, height) so the shorter side is short_side, with even dimensions."""
+    scale = short_side / min(width, height)
+    return int(round(width * scale / 2)) * 2, int(round(height * scale / 2)) * 2
+
+
+def transcode_rendition(video_path, output_path, width, height, max_bitrate, crf=26, timeout=None):
+    """
+    Transcode a video into a single faststart MP4 rendition
+
+    The output is written to a temporary file and moved into place when
+    ffmpeg succeeds, so a partial rendition is never served.
+
+    Args:
+        video_path (str): Path to the source video
+        output_path (str): Path of the rendition
+        width (int): Output width in pixels
+        height (int): Output height in pixels
+        max_bitrate (str): Video bitrate cap (e.g. '900k')
+        crf (int): x264 constant rate factor
+        timeout (float): Seconds before ffmpeg is killed
+    """
+    tmp_path = f"{output_path}.tmp.mp4"
+    bufsize = f"{int(max_bitrate.rstrip('k')) * 2}k"
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-i', str(video_path),
+        '-vf', f"scale={width}:{height}",
+        '-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf),
+        '-maxrate', max_bitrate, '-bufsize', bufsize,
+        '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '96k', '-ac', '2',
+        '-movflags', '+faststart',
+        tmp_path
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def transcode_video(video_path, output_dir, renditions=RENDITIONS, timeout=None):
+    """
+    Build all renditions of a video that are smaller than the source
+
+    Args:
+        video_path (str): Path to the source video
+        output_dir (str): Directory to save the renditions
+        renditions (tuple): (name, short side, max bitrate) tuples
+        timeout (float): Seconds before a single ffmpeg run is killed
+
+    Returns:
+        list: Manifest entries of the generated renditions
+    """
+    video_file = Path(video_path)
+    size = get_video_size(video_file)
+    if not size or not all(size):
+        raise RuntimeError(f"Could not open video {video_path}")
+
+    entries = []
+    for name, short_side, max_bitrate in renditions:
+        # Never upscale: skip renditions at or above the source resolution
+        if short_side >= min(size):
+            continue
+        width, height = rendition_size(*size, short_side)
+        filename = f"{video_file.stem}-{name}.mp4"
+        output_path = Path(output_dir) / filename
+
+        print(f"Transcoding {video_file.name} -> {filename} ({width}x{height}, max {max_bitrate})")
+        transcode_rendition(video_file, output_path, width, height, max_bitrate, timeout=timeout)
+        entries.append({
+            'name': name,
+            'file': filename,
+            'width': width,
+            'height': height,
+            'bitrate': max_bitrate,
+            'size': output_path.stat().st_size,
+        })
+    return entries
+
+
+def build_renditions(directory, output_dir, renditions=RENDITIONS, jobs=1, timeout=None, cache=None):
+    """
+    Transcode all videos in a directory and write the rendition manifest
+
+    Args:
+        directory (str): Directory containing the source videos
+        output_dir (str): Directory to save renditions and the manifest
+        renditions (tuple): (name, short side, max bitrate) tuples
+        jobs (int): Number of videos transcoded in parallel
+        timeout (float): Seconds before a single ffmpeg run is killed
+        cache (BuildCache): Skip videos whose renditions are up to date
+
+    Returns:
+        list: BatchResult objects for the transcoded videos
+    """
+    if shutil.which('ffmpeg') is None:
+        print("Error: ffmpeg is required to transcode videos")
+        return None
+
+    directory_path = Path(directory)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    video_files = sorted(f for f in directory_path.glob('*.*') if f.suffix.lower() in VIDEO_EXTENSIONS)
+    if not video_files:
+        print(f"No videos found in {directory}")
+        return []
+
+    params = {'renditions': [list(rendition) for rendition in renditions]}
+    manifest = {}
+    pending = []
+    for video_file in video_files:
+        if cache is not None:
+            entries = cache.get_data('renditions', video_file)
+            outputs = [output_path / entry['file'] for entry in entries or []]
+            if entries is not None and cache.is_fresh('renditions', video_file, params, outputs):
+                manifest[video_file.name] = entries
+                continue
+        pending.append(video_file)
+
+    results = []
+    if pending:
+        jobs = min(resolve_jobs(jobs), len(pending))
+        print(f"Transcoding {len(pending)} videos using {jobs} worker(s)")
+        start = time.perf_counter()
+        results = run_batch(transcode_video, pending, (output_path, renditions, timeout), jobs, print_progress)
+        print_batch_report(results, time.perf_counter() - start, jobs, 'videos')
+
+        for result in results:
+            if result.ok:
+                manifest[result.item.name] = result.value
+                if cache is not None:
+                    outputs = [output_path / entry['file'] for entry in result.value]
+                    cache.record('renditions', result.item, params, outputs, data=result.value)
+    else:
+        print("All renditions are up to date.")
+
+    if cache is not None:
+        cache.save()
+
+    tmp_path = output_path / f".{RENDITION_MANIFEST}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'videos': manifest}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, output_path / RENDITION_MANIFEST)
+    print(f"Wrote rendition manifest for {len(manifest)} videos to {output_path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode videos into faststart streaming renditions")
+    parser.add_argument('--dir', default='static/assets/videos',
+                        help="Directory containing videos (default: static/assets/videos)")
+    parser.add_argument('--output',
+                        help="Directory to save renditions (default: renditions/ inside --dir)")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of videos transcoded in parallel, 0 uses all CPU cores (default: 1)")
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="Seconds before a single ffmpeg run is killed, 0 disables (default: 600)")
+    parser.add_argument('--cache',
+                        help="Build manifest used to skip unchanged videos (default: instance/build-cache.json next to the static folder)")
+    parser.add_argument('--force', action='store_true',
+                        help="Transcode all videos, ignoring the build manifest")
+
+    args = parser.parse_args()
+
+    cache_path = args.cache or default_cache_path(args.dir)
+    cache = BuildCache(cache_path, force=args.force) if cache_path else None
+    output = args.output or os.path.join(args.dir, 'renditions')
+    results = build_renditions(args.dir, output, RENDITIONS, args.jobs, args.timeout or None, cache)
+    save_catalog_snapshot(args.dir)
+    if results is None:
+        return 1
+    return 1 if any(not result.ok for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())